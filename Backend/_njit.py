@@ -0,0 +1,18 @@
+# Use numba's njit when it is installed, otherwise fall back to running the plain Python function.
+# Supports all the usual forms: @njit, @njit(cache=True) and @njit("float64[:](float64[:])", cache=True)
+# prange falls back to range, so parallel loops simply run one after another.
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:         # Used as a bare @njit
+            return args[0]
+
+        def decorator(func):                                            # Used as @njit(...) with options
+            return func
+        return decorator
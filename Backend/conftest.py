@@ -0,0 +1,2 @@
+# test.py is a manual yfinance/yesg lookup script that runs on import, not a test module
+collect_ignore = ["test.py"]
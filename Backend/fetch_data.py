@@ -1,24 +1,88 @@
+import numpy as np                                                      # Import numpy for the closing-price arrays fed to the indicators
 import pandas as pd                                                     # Import pandas for data handling and DataFrame manipulation
 import yfinance as yf                                                   # Import yfinance to fetch stock market data
 import os                                                               # Import os for file and path handling
 import sys                                                              # Import sys to modify Python path for module imports
+from datetime import date, timedelta                                    # Today's date keys the on-disk cache and the history window
+from concurrent.futures import ThreadPoolExecutor                       # Thread pool to fetch several tickers at once
+
+MAX_WORKERS = 16                                                        # Upper bound on concurrent Yahoo Finance requests
+HISTORY_DAYS = 430                                                      # ~14 months (~295 bars): covers SMA 200 plus EMA warm-up for MACD
 
 
 # ----------------------------------------------- Add the scripts directory to Python path ---------------------------------------------
 
 scripts_dir = os.path.dirname(os.path.abspath(__file__))                # Get the directory where this script is located
+BASE_DIR = os.path.dirname(scripts_dir)                                 # Project root, one folder up (resolved once at import)
+DEFAULT_EXCEL_PATH = os.path.join(BASE_DIR, "Stock_data.xlsm")          # Default Excel file name
 if scripts_dir not in sys.path:                                         # Check if that directory is not already in Python's search path
     sys.path.append(scripts_dir)                                        # Add it to Python’s module search path
 
 
+# ------------------------------------------------- Disk cache for Yahoo Finance lookups ----------------------------------------------
+# Statements, recommendations and ESG do not change during a trading day, so re-runs on the same
+# day read them from disk instead of asking Yahoo again. `info` is NOT cached: it carries the
+# live price and analyst targets, which must stay in step with the freshly downloaded history.
+
+try:
+    from joblib import Memory
+    memory = Memory(os.path.join(BASE_DIR, ".yf_cache"), verbose=0)
+    try:
+        memory.reduce_size(age_limit=timedelta(days=1))                 # Drop entries from previous days so the folder doesn't grow forever
+    except TypeError:                                                   # joblib < 1.4 has no age_limit
+        memory.clear(warn=False)
+    cache = memory.cache
+except ImportError:
+    print("⚠️  joblib not installed, Yahoo Finance data will not be cached")
+    memory = None
+    def cache(func):                                                    # No-op decorator when joblib is missing
+        return func
+
+
+@cache
+def _get_ticker_data(ticker, attr, day):
+    """Return yf.Ticker(ticker).<attr>; `day` is only part of the cache key"""
+    return getattr(yf.Ticker(ticker), attr)
+
+
+def _is_empty(value):
+    # What yfinance hands back when a lookup failed or was rate limited
+    if value is None:
+        return True
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.empty
+    if isinstance(value, (dict, list)):
+        return not value
+    return False
+
+
+def get_ticker_data(ticker, attr):
+    """Cached access to a yf.Ticker attribute (financials, recommendations, ...), refreshed once per day"""
+    day = date.today().isoformat()
+    if memory is None:
+        return _get_ticker_data(ticker, attr, day)
+
+    stored = _get_ticker_data.call_and_shelve(ticker, attr, day)
+    value = stored.get()
+    if _is_empty(value):
+        stored.clear()                                                  # Don't keep a failed lookup for the rest of the day
+    return value
+
+
 # ------------------------------------------------- Import indicators with fallback ----------------------------------------------------
 
 try:
-    from indicators import calculate_rsi, calculate_macd, calculate_sma # Try importing custom RSI and MACD functions
+    from indicators import (                                            # Try importing the latest-value RSI, MACD and SMA helpers
+        calculate_rsi_last, calculate_macd_last, calculate_sma_last_multi,
+        calculate_technicals_batch, NUMBA_AVAILABLE,
+    )
     print(" Imported indicators from local module")
 except ImportError:
     try:
-        from .indicators import calculate_rsi, calculate_macd, calculate_sma # Alternative import style (relative import if using packages)
+        from .indicators import (                                       # Alternative import style (relative import if using packages)
+            calculate_rsi_last, calculate_macd_last, calculate_sma_last_multi,
+            calculate_technicals_batch, NUMBA_AVAILABLE,
+        )
         print(" Imported indicators from relative module")
     except ImportError:
         print("❌ Could not import indicators module")
@@ -33,35 +97,87 @@ except ImportError:
             rsi = 100 - (100 / (1 + rs))                                # Final RSI formula
             return rsi
 
+        try:
+            from scipy.signal import lfilter                            # Faster EMA recursion when scipy is available
+        except ImportError:
+            lfilter = None
+
+        def _ema(close_prices, span):
+            if lfilter is None or close_prices.empty or close_prices.isna().any():
+                return close_prices.ewm(span=span, adjust=False).mean()
+            alpha = 2 / (span + 1)
+            values = close_prices.to_numpy(dtype=float)
+            ema, _ = lfilter([alpha], [1, alpha - 1], values, zi=[(1 - alpha) * values[0]])  # Same as ewm(adjust=False)
+            return pd.Series(ema, index=close_prices.index)
+
         def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
-            ema_short = close_prices.ewm(span=short_window, adjust=False).mean()    # 12-day EMA
-            ema_long = close_prices.ewm(span=long_window, adjust=False).mean()      # 26-day EMA
+            ema_short = _ema(close_prices, short_window)                            # 12-day EMA
+            ema_long = _ema(close_prices, long_window)                              # 26-day EMA
             macd = ema_short - ema_long                                             # MACD = short EMA - long EMA
-            signal = macd.ewm(span=signal_window, adjust=False).mean()              # Signal line (9-day EMA of MACD)
+            signal = _ema(macd, signal_window)                                      # Signal line (9-day EMA of MACD)
             histogram = macd - signal                                               # Difference = histogram
             return macd, signal, histogram
 
         def calculate_sma(close_prices, window=20):
             return close_prices.rolling(window=window).mean()
 
+        # Latest-value helpers used by the fetch loop (they receive a numpy array of closes)
+        def calculate_rsi_last(close_prices, period=14):
+            return calculate_rsi(pd.Series(close_prices), period).iloc[-1]
+
+        def calculate_macd_last(close_prices, short_window=12, long_window=26, signal_window=9):
+            macd, signal, _ = calculate_macd(pd.Series(close_prices), short_window, long_window, signal_window)
+            return macd.iloc[-1], signal.iloc[-1]
+
+        def calculate_sma_last(close_prices, window=20):
+            return calculate_sma(pd.Series(close_prices), window).iloc[-1]
+
+        def calculate_sma_last_multi(close_prices, windows=(20, 50, 200)):
+            return tuple(calculate_sma_last(close_prices, w) for w in windows)
+
+        NUMBA_AVAILABLE = False                                                     # compute_technicals then goes ticker by ticker
+        calculate_technicals_batch = None
+
+# -------------------------------------------------- Excel reader engine ----------------------------------------------------
+# python-calamine (Rust) parses the workbook much faster than openpyxl; use it when installed
+
+try:
+    import python_calamine                                                          # noqa: F401  (only checking it is installed)
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = None                                                             # Let pandas pick its default (openpyxl)
+
+
+def open_workbook(excel_path):
+    """Open the workbook once so Sheet1 and Manual_ESG are read from the same parsed file (None if it cannot be opened)"""
+    try:
+        return pd.ExcelFile(excel_path, engine=EXCEL_ENGINE)
+    except Exception as e:
+        print(f"⚠️  Could not open {excel_path}: {e}")
+        return None
+
 # -------------------------------------------------- Read tickers from Excel Subsheet(Sheet1) ----------------------------------------------------
 
 def get_tickers_from_excel(excel_path=None, sheet_name="Sheet1"):
-    if excel_path is None:                                                          # If no path is provided, locate Stock_data.xlsm automatically
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))      # Go one folder up
-        excel_path = os.path.join(base_dir, "Stock_data.xlsm")                       # Default Excel file name
+    # excel_path may also be a pd.ExcelFile already opened by the caller (see open_workbook)
+    if not isinstance(excel_path, pd.ExcelFile):
+        if excel_path is None:                                                      # If no path is provided, use Stock_data.xlsm in the project root
+            excel_path = DEFAULT_EXCEL_PATH
 
-    print(f"📁 Looking for Excel file at: {excel_path}")
+        print(f"📁 Looking for Excel file at: {excel_path}")
 
-    if not os.path.exists(excel_path):                                              # If the file does not exist
-        print(f"❌ Excel file not found at: {excel_path}")
-        return ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN"]                            # Return fallback tickers
+        if not os.path.exists(excel_path):                                          # If the file does not exist
+            print(f"❌ Excel file not found at: {excel_path}")
+            return ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN"]                        # Return fallback tickers
 
     try:
-        excel_file = pd.ExcelFile(excel_path)                                       # Load Excel file to check sheet names
+        excel_file = excel_path
+        if not isinstance(excel_file, pd.ExcelFile):
+            excel_file = pd.ExcelFile(excel_path, engine=EXCEL_ENGINE)              # Load Excel file to check sheet names
         print(f" Available sheets: {excel_file.sheet_names}")
 
-        df = pd.read_excel(excel_path, sheet_name=sheet_name)                       # Read the specified sheet
+        df = pd.read_excel(excel_file, sheet_name=sheet_name,                       # Read the specified sheet (reusing the opened workbook)
+                           usecols=[0], dtype="string")                             # Only the ticker column is needed
         print(f" Successfully read sheet: {sheet_name}")
         print(f"Columns found: {df.columns.tolist()}")                              # Show columns found in Excel
 
@@ -76,8 +192,12 @@ def get_tickers_from_excel(excel_path=None, sheet_name="Sheet1"):
 
 # -------------------------------------------------- Read ESG from from Excel Subsheet(Manual_ESG) ----------------------------------------------------
 def read_manual_esg(excel_path):
+    # excel_path may also be a pd.ExcelFile already opened by the caller (see open_workbook)
     try:
-        df = pd.read_excel(excel_path, sheet_name="Manual_ESG")
+        excel_file = excel_path
+        if not isinstance(excel_file, pd.ExcelFile):
+            excel_file = pd.ExcelFile(excel_path, engine=EXCEL_ENGINE)
+        df = pd.read_excel(excel_file, sheet_name="Manual_ESG")
 
         # Normalize ticker for safe joining
         df["Ticker"] = (
@@ -104,6 +224,25 @@ def read_manual_esg(excel_path):
 
 # --------------------------------------- Fetch data and calculate indicators for each ticker ------------------------------------------
 
+# Rows read from each statement; alternatives for the same figure are listed in order of preference
+INCOME_ROWS = ('Gross Profit', 'Operating Income', 'EBIT', 'Net Income', 'Total Revenue')
+BALANCE_ROWS = ('Total Cash', 'Total Debt', 'Total Equity', 'Total Stockholder Equity', 'Stockholders Equity')
+CASH_FLOW_ROWS = ('Free Cash Flow', 'Operating Cash Flow')
+QUARTERLY_REVENUE_ROWS = ('Total Revenue', 'Revenue', 'Operating Revenue', 'Sales Revenue')
+QUARTERLY_EARNINGS_ROWS = ('Net Income', 'Net Income Common Stockholders', 'Net Income Continuous Operations')
+ESG_ROWS = ('totalEsg', 'environmentScore', 'socialScore', 'governanceScore', 'percentile')
+
+
+def _statement_rows(statement, wanted):
+    """Return {row label: numpy array} for the wanted rows present in a yfinance statement"""
+
+    if not isinstance(statement, pd.DataFrame) or statement.empty:
+        return {}
+
+    present = frozenset(statement.index)                                           # Hash the row labels once
+    return {label: statement.loc[label].to_numpy() for label in wanted if label in present}
+
+
 def calculate_quarterly_growth(stock):
     """Calculate quarterly revenue and earnings growth from financial statements"""
     
@@ -112,37 +251,30 @@ def calculate_quarterly_growth(stock):
     
     try:
         # Get QUARTERLY financial statements
-        quarterly_income = stock.quarterly_financials  # This is quarterly!
+        quarterly_income = get_ticker_data(stock.ticker, "quarterly_financials")  # This is quarterly!
+        rows = _statement_rows(quarterly_income, QUARTERLY_REVENUE_ROWS + QUARTERLY_EARNINGS_ROWS)
         
-        if not quarterly_income.empty:
+        if rows:
             # Check available revenue metrics
-            revenue_metric = None
-            for metric in ['Total Revenue', 'Revenue', 'Operating Revenue', 'Sales Revenue']:
-                if metric in quarterly_income.index:
-                    revenue_metric = metric
-                    break
+            revenue_metric = next((m for m in QUARTERLY_REVENUE_ROWS if m in rows), None)
             
             # Calculate revenue growth
             if revenue_metric:
-                revenues = quarterly_income.loc[revenue_metric]
+                revenues = rows[revenue_metric]
                 if len(revenues) >= 2:
-                    revenue_current = revenues.iloc[0]  # Most recent quarter
-                    revenue_previous = revenues.iloc[1]  # Previous quarter
+                    revenue_current = revenues[0]  # Most recent quarter
+                    revenue_previous = revenues[1]  # Previous quarter
                     if revenue_previous != 0:
                         revenue_q_growth = (revenue_current - revenue_previous) / revenue_previous
             
             # Calculate earnings growth
-            earnings_metric = None
-            for metric in ['Net Income', 'Net Income Common Stockholders', 'Net Income Continuous Operations']:
-                if metric in quarterly_income.index:
-                    earnings_metric = metric
-                    break
+            earnings_metric = next((m for m in QUARTERLY_EARNINGS_ROWS if m in rows), None)
             
             if earnings_metric:
-                earnings = quarterly_income.loc[earnings_metric]
+                earnings = rows[earnings_metric]
                 if len(earnings) >= 2:
-                    earnings_current = earnings.iloc[0]
-                    earnings_previous = earnings.iloc[1]
+                    earnings_current = earnings[0]
+                    earnings_previous = earnings[1]
                     if earnings_previous != 0:
                         earnings_q_growth = (earnings_current - earnings_previous) / earnings_previous
     
@@ -152,274 +284,436 @@ def calculate_quarterly_growth(stock):
     return revenue_q_growth, earnings_q_growth
 
 
-def fetch_stock_data_with_indicators(tickers):
-    all_data = []                                                                  
+def history_start():
+    """First date of price history we need (only the latest indicator values are shown)"""
+    return (date.today() - timedelta(days=HISTORY_DAYS)).isoformat()
 
-    for ticker in tickers:                                                          
-        try:
-            print(f"📊 Fetching data for {ticker}...")
-            stock = yf.Ticker(ticker)                                              
 
-            info = stock.info if hasattr(stock, 'info') else {}                                                    
-            hist = stock.history(period="5y")                                      
+def download_history(tickers, start=None):
+    """Download daily price history for all tickers in one batched request"""
 
-            # ---------------- Fundamental Metrics ----------------
-            current_price = info.get("currentPrice") or info.get("regularMarketPrice")
-            pe_ratio = info.get("trailingPE") or info.get("forwardPE")
-            market_cap = info.get("marketCap")
-            dividend_yield = info.get("dividendYield")
-            
-            # ---------------- Get Financial Statements ----------------
-            grossProfit = operatingIncome = netIncome = None
-            totalCash = totalDebt = totalDebtToEquity = None
-            freeCashflow = operatingCashflow = None
-            
-            try:
-                # Get annual financial statements
-                income_stmt = stock.financials
-                balance_sheet = stock.balance_sheet
-                cash_flow = stock.cashflow
-                
-                if not income_stmt.empty:
-                    # Get latest annual values
-                    if 'Gross Profit' in income_stmt.index:
-                        grossProfit = income_stmt.loc['Gross Profit'].iloc[0]
-                    if 'Operating Income' in income_stmt.index:
-                        operatingIncome = income_stmt.loc['Operating Income'].iloc[0]
-                    elif 'EBIT' in income_stmt.index:
-                        operatingIncome = income_stmt.loc['EBIT'].iloc[0]
-                    if 'Net Income' in income_stmt.index:
-                        netIncome = income_stmt.loc['Net Income'].iloc[0]
-                
-                if not balance_sheet.empty:
-                    # Get balance sheet values
-                    if 'Total Cash' in balance_sheet.index:
-                        totalCash = balance_sheet.loc['Total Cash'].iloc[0]
-                    if 'Total Debt' in balance_sheet.index:
-                        totalDebt = balance_sheet.loc['Total Debt'].iloc[0]
-                    
-                    # Calculate Debt to Equity
-                    totalEquity = None
-                    for equity_metric in ['Total Equity', 'Total Stockholder Equity', 'Stockholders Equity']:
-                        if equity_metric in balance_sheet.index:
-                            totalEquity = balance_sheet.loc[equity_metric].iloc[0]
-                            break
-                    
-                    if totalDebt and totalEquity and totalEquity != 0:
-                        totalDebtToEquity = totalDebt / totalEquity
-                
-                if not cash_flow.empty:
-                    if 'Free Cash Flow' in cash_flow.index:
-                        freeCashflow = cash_flow.loc['Free Cash Flow'].iloc[0]
-                    if 'Operating Cash Flow' in cash_flow.index:
-                        operatingCashflow = cash_flow.loc['Operating Cash Flow'].iloc[0]
-                        
-            except Exception as e:
-                print(f"⚠️  Financial statements error for {ticker}: {e}")
+    try:
+        return yf.download(
+            list(tickers),
+            start=start or history_start(),
+            interval="1d",
+            group_by="ticker",
+            auto_adjust=True,                                                       # Same adjusted prices as Ticker.history()
+            threads=True,
+            progress=False,
+        )
+    except Exception as e:
+        print(f"⚠️  Batch history download failed, falling back to per-ticker requests: {e}")
+        return None
+
+
+def _history_for(hist_all, ticker):
+    """Slice one ticker's history out of the batched download (None if it is not there)"""
+
+    if hist_all is None or hist_all.empty:
+        return None
+
+    if not isinstance(hist_all.columns, pd.MultiIndex):                             # Older yfinance returns flat columns for a single ticker
+        return hist_all.dropna(how="all")
+
+    symbol = str(ticker).upper()                                                    # yf.download upper-cases the symbols it was given
+    if symbol not in hist_all.columns.get_level_values(0):
+        return None
+
+    return hist_all[symbol].dropna(how="all")
+
+
+def _process_ticker(ticker, hist=None):
+    """Fetch fundamentals, analyst data, technicals and ESG for a single ticker"""
+
+    try:
+        print(f"📊 Fetching data for {ticker}...")
+        stock = yf.Ticker(ticker)
+
+        info = stock.info or {}                                                   # Live: current price and targets
+        if hist is None:                                                           # Not in the batched download, fetch it on its own
+            hist = stock.history(start=history_start(), interval="1d")
+
+        # ---------------- Fundamental Metrics ----------------
+        current_price = info.get("currentPrice") or info.get("regularMarketPrice")
+        pe_ratio = info.get("trailingPE") or info.get("forwardPE")
+        market_cap = info.get("marketCap")
+        dividend_yield = info.get("dividendYield")
+        
+        # ---------------- Get Financial Statements ----------------
+        grossProfit = operatingIncome = netIncome = None
+        totalCash = totalDebt = totalDebtToEquity = None
+        freeCashflow = operatingCashflow = None
+        income = {}
+        
+        try:
+            # Get annual financial statements as {row label: numpy array of yearly values}
+            income = _statement_rows(get_ticker_data(ticker, "financials"), INCOME_ROWS)
+            balance = _statement_rows(get_ticker_data(ticker, "balance_sheet"), BALANCE_ROWS)
+            cash = _statement_rows(get_ticker_data(ticker, "cashflow"), CASH_FLOW_ROWS)
             
-            # ---------------- Calculate Growth Metrics ----------------
-            # 1. Annual Growth (from info or calculate)
-            earnings_growth = info.get("earningsGrowth")
-            revenue_growth = info.get("revenueGrowth")
+            # Get latest annual values (column 0 is the most recent year)
+            if 'Gross Profit' in income:
+                grossProfit = income['Gross Profit'][0]
+            if 'Operating Income' in income:
+                operatingIncome = income['Operating Income'][0]
+            elif 'EBIT' in income:
+                operatingIncome = income['EBIT'][0]
+            if 'Net Income' in income:
+                netIncome = income['Net Income'][0]
             
-            if not earnings_growth or not revenue_growth:
-                try:
-                    if not income_stmt.empty:
-                        # Annual revenue growth
-                        if 'Total Revenue' in income_stmt.index:
-                            revenues = income_stmt.loc['Total Revenue']
-                            if len(revenues) >= 2:
-                                rev_current = revenues.iloc[0]
-                                rev_previous = revenues.iloc[1]
-                                if rev_previous != 0:
-                                    revenue_growth = (rev_current - rev_previous) / rev_previous
-                        
-                        # Annual earnings growth
-                        if 'Net Income' in income_stmt.index:
-                            earnings = income_stmt.loc['Net Income']
-                            if len(earnings) >= 2:
-                                earn_current = earnings.iloc[0]
-                                earn_previous = earnings.iloc[1]
-                                if earn_previous != 0:
-                                    earnings_growth = (earn_current - earn_previous) / earn_previous
-                except:
-                    pass
+            # Get balance sheet values
+            if 'Total Cash' in balance:
+                totalCash = balance['Total Cash'][0]
+            if 'Total Debt' in balance:
+                totalDebt = balance['Total Debt'][0]
             
-            # 2. QUARTERLY Growth (calculate from quarterly financials)
-            revenue_q_growth, earnings_q_growth = calculate_quarterly_growth(stock)
+            # Calculate Debt to Equity
+            totalEquity = None
+            equity_metric = next(
+                (m for m in ['Total Equity', 'Total Stockholder Equity', 'Stockholders Equity'] if m in balance),
+                None
+            )
+            if equity_metric:
+                totalEquity = balance[equity_metric][0]
             
-            # If still None, try from info as fallback
-            if earnings_q_growth is None:
-                earnings_q_growth = info.get("earningsQuarterlyGrowth")
-            if revenue_q_growth is None:
-                revenue_q_growth = info.get("revenueQuarterlyGrowth")
+            if totalDebt and totalEquity and totalEquity != 0:
+                totalDebtToEquity = totalDebt / totalEquity
             
-            # ---------------- Analyst Indicators ----------------
-            recommendations = stock.recommendations
-            strong_buy = buy = hold = sell = strong_sell = None
-            total_analysts = None
-
-            if recommendations is not None and not recommendations.empty:
-                if 'period' in recommendations.columns:
-                    latest = recommendations.loc[recommendations["period"] == "0m"]
-                else:
-                    latest = recommendations.tail(1)
-                
-                if not latest.empty:
-                    strong_buy = int(latest.get("strongBuy", [0]).iloc[0]) if "strongBuy" in latest.columns else 0
-                    buy = int(latest.get("buy", [0]).iloc[0]) if "buy" in latest.columns else 0
-                    hold = int(latest.get("hold", [0]).iloc[0]) if "hold" in latest.columns else 0
-                    sell = int(latest.get("sell", [0]).iloc[0]) if "sell" in latest.columns else 0
-                    strong_sell = int(latest.get("strongSell", [0]).iloc[0]) if "strongSell" in latest.columns else 0
+            if 'Free Cash Flow' in cash:
+                freeCashflow = cash['Free Cash Flow'][0]
+            if 'Operating Cash Flow' in cash:
+                operatingCashflow = cash['Operating Cash Flow'][0]
                     
-                    total_analysts = strong_buy + buy + hold + sell + strong_sell
-
-            target_mean = info.get("targetMeanPrice")
-            target_high = info.get("targetHighPrice")
-            target_low = info.get("targetLowPrice")
-
-            # ---------------- Upside / Downside % ----------------
-            upside_pct = None
-            if current_price and target_mean:
-                try:
-                    upside_pct = ((target_mean - current_price) / current_price) * 100
-                except (TypeError, ZeroDivisionError):
-                    upside_pct = None
-
-            if upside_pct is not None:
-                if upside_pct >= 15:
-                    upside_label = "High Upside"
-                elif upside_pct >= 5:
-                    upside_label = "Moderate Upside"
-                else:
-                    upside_label = "Limited / Downside"
-            else:
-                upside_label = "N/A"
-
-            # -------------- Technical Indicators ---------------
-            if not hist.empty and len(hist) > 200:
-                close_prices = hist["Close"]
-                
-                rsi = calculate_rsi(close_prices).iloc[-1] if len(close_prices) >= 14 else None
-                
-                macd, signal, _ = calculate_macd(close_prices)
-                macd_value = macd.iloc[-1] if not macd.empty else None
-                signal_value = signal.iloc[-1] if not signal.empty else None
+        except Exception as e:
+            print(f"⚠️  Financial statements error for {ticker}: {e}")
+        
+        # ---------------- Calculate Growth Metrics ----------------
+        # 1. Annual Growth (from info or calculate)
+        earnings_growth = info.get("earningsGrowth")
+        revenue_growth = info.get("revenueGrowth")
+        
+        if not earnings_growth or not revenue_growth:
+            try:
+                # Annual revenue growth
+                if 'Total Revenue' in income:
+                    revenues = income['Total Revenue']
+                    if len(revenues) >= 2:
+                        rev_current = revenues[0]
+                        rev_previous = revenues[1]
+                        if rev_previous != 0:
+                            revenue_growth = (rev_current - rev_previous) / rev_previous
                 
-                sma_20 = calculate_sma(close_prices, window=20).iloc[-1] if len(close_prices) >= 20 else None
-                sma_50 = calculate_sma(close_prices, window=50).iloc[-1] if len(close_prices) >= 50 else None
-                sma_200 = calculate_sma(close_prices, window=200).iloc[-1] if len(close_prices) >= 200 else None
+                # Annual earnings growth
+                if 'Net Income' in income:
+                    earnings = income['Net Income']
+                    if len(earnings) >= 2:
+                        earn_current = earnings[0]
+                        earn_previous = earnings[1]
+                        if earn_previous != 0:
+                            earnings_growth = (earn_current - earn_previous) / earn_previous
+            except:
+                pass
+        
+        # 2. QUARTERLY Growth (calculate from quarterly financials)
+        revenue_q_growth, earnings_q_growth = calculate_quarterly_growth(stock)
+        
+        # If still None, try from info as fallback
+        if earnings_q_growth is None:
+            earnings_q_growth = info.get("earningsQuarterlyGrowth")
+        if revenue_q_growth is None:
+            revenue_q_growth = info.get("revenueQuarterlyGrowth")
+        
+        # ---------------- Analyst Indicators ----------------
+        recommendations = get_ticker_data(ticker, "recommendations")
+        strong_buy = buy = hold = sell = strong_sell = None
+        total_analysts = None
+
+        if recommendations is not None and not recommendations.empty:
+            if 'period' in recommendations.columns:
+                latest = recommendations.loc[recommendations["period"] == "0m"]
             else:
-                rsi = macd_value = signal_value = sma_20 = sma_50 = sma_200 = None 
+                latest = recommendations.tail(1)
+            
+            if not latest.empty:
+                row = latest.iloc[0]                                            # Extract the row once, then plain lookups
+                strong_buy = int(row.get("strongBuy", 0) or 0)
+                buy = int(row.get("buy", 0) or 0)
+                hold = int(row.get("hold", 0) or 0)
+                sell = int(row.get("sell", 0) or 0)
+                strong_sell = int(row.get("strongSell", 0) or 0)
+                
+                total_analysts = strong_buy + buy + hold + sell + strong_sell
 
-            # ---------------- ESG DATA ----------------
-            esg_total = esg_env = esg_social = esg_gov = esg_percentile = None
+        target_mean = info.get("targetMeanPrice")
+        target_high = info.get("targetHighPrice")
+        target_low = info.get("targetLowPrice")
 
+        # ---------------- Upside / Downside % ----------------
+        upside_pct = None
+        if current_price and target_mean:
             try:
-                esg = stock.sustainability
-
-                if isinstance(esg, pd.DataFrame) and not esg.empty:
-                    if "totalEsg" in esg.index:
-                        esg_total = esg.loc["totalEsg"].values[0] if len(esg.loc["totalEsg"].values) > 0 else None
-                    if "environmentScore" in esg.index:
-                        esg_env = esg.loc["environmentScore"].values[0] if len(esg.loc["environmentScore"].values) > 0 else None
-                    if "socialScore" in esg.index:
-                        esg_social = esg.loc["socialScore"].values[0] if len(esg.loc["socialScore"].values) > 0 else None
-                    if "governanceScore" in esg.index:
-                        esg_gov = esg.loc["governanceScore"].values[0] if len(esg.loc["governanceScore"].values) > 0 else None
-                    if "percentile" in esg.index:
-                        esg_percentile = esg.loc["percentile"].values[0] if len(esg.loc["percentile"].values) > 0 else None
-
-            except Exception as e:
-                print(f"ESG unavailable for {ticker}: {str(e)[:100]}")
-
-            data = {
-                "Ticker": ticker,
-                "Current Price": round(current_price, 2) if current_price else "N/A",
-
-                # --- Valuation ---
-                "PE Ratio": round(pe_ratio, 2) if pe_ratio else "N/A",
-                "Market Cap": f"{round(market_cap / 1e9, 2)}B" if market_cap else "N/A",
-                "Dividend Yield": round(dividend_yield, 4) if dividend_yield else "N/A",
-
-                # --- Financial Performance ---
-                "Gross Profit": f"{round(grossProfit / 1e9, 2)}B" if grossProfit else "N/A",
-                "Operating Income": f"{round(operatingIncome / 1e9, 2)}B" if operatingIncome else "N/A",
-                "Net Income": f"{round(netIncome / 1e9, 2)}B" if netIncome else "N/A",
-
-                # --- Balance Sheet ---
-                "Total Cash": f"{round(totalCash / 1e9, 2)}B" if totalCash else "N/A",
-                "Total Debt": f"{round(totalDebt / 1e9, 2)}B" if totalDebt else "N/A",
-                "Debt to Equity": round(totalDebtToEquity, 2) if totalDebtToEquity else "N/A",
-
-                # --- Cash Flow ---
-                "Free Cash Flow": f"{round(freeCashflow / 1e9, 2)}B" if freeCashflow else "N/A",
-                "Operating Cash Flow": f"{round(operatingCashflow / 1e9, 2)}B" if operatingCashflow else "N/A",
-
-                # --- Growth Metrics ---
-                "Earnings Growth YoY": f"{round(earnings_growth*100, 2)}%" if earnings_growth else "N/A",
-                "Revenue Growth YoY": f"{round(revenue_growth*100, 2)}%" if revenue_growth else "N/A",
-                "Earnings QoQ Growth": f"{round(earnings_q_growth*100, 2)}%" if earnings_q_growth else "N/A",
-                "Revenue QoQ Growth": f"{round(revenue_q_growth*100, 2)}%" if revenue_q_growth else "N/A",
-
-                # --- Technicals ---
-                "RSI (14)": round(rsi, 2) if rsi is not None else "N/A",
-                "SMA 20": round(sma_20, 2) if sma_20 is not None else "N/A",
-                "SMA 50": round(sma_50, 2) if sma_50 is not None else "N/A",
-                "SMA 200": round(sma_200, 2) if sma_200 is not None else "N/A",
-                "MACD": round(macd_value, 2) if macd_value is not None else "N/A",
-                "Signal Line": round(signal_value, 2) if signal_value is not None else "N/A",
-
-                # --- Analyst Estimates ---
-                "Strong Buy": strong_buy if strong_buy is not None else "N/A",
-                "Buy": buy if buy is not None else "N/A",
-                "Hold": hold if hold is not None else "N/A",
-                "Sell": sell if sell is not None else "N/A",
-                "Strong Sell": strong_sell if strong_sell is not None else "N/A",
-                "Total Analysts (Breakdown)": total_analysts if total_analysts is not None else "N/A",
-                "Target Mean": round(target_mean, 2) if target_mean else "N/A",
-                "Target High": round(target_high, 2) if target_high else "N/A",
-                "Target Low": round(target_low, 2) if target_low else "N/A",
-                "Upside %": f"{round(upside_pct, 2)}%" if upside_pct is not None else "N/A",
-                "Upside View": upside_label,
-
-                # --- ESG Scores ---
-                "ESG Total Score": round(esg_total, 2) if esg_total is not None else "N/A",
-                "ESG Environment": round(esg_env, 2) if esg_env is not None else "N/A",
-                "ESG Social": round(esg_social, 2) if esg_social is not None else "N/A",
-                "ESG Governance": round(esg_gov, 2) if esg_gov is not None else "N/A",
-                "ESG Percentile": round(esg_percentile, 2) if esg_percentile is not None else "N/A",
-            }
-
-            all_data.append(data)                                                  
-            print(f"✅ Successfully processed {ticker}")
-
-        except Exception as e:                                                      # If stock data fetching fails
-            print(f"❌ Error fetching {ticker}: {e}")
-            all_data.append({
-                "Ticker": ticker,
-                "Current Price": "Error",
-                "Error Message": str(e)[:100]
-            })
-
-    return pd.DataFrame(all_data)
+                upside_pct = ((target_mean - current_price) / current_price) * 100
+            except (TypeError, ZeroDivisionError):
+                upside_pct = None
+
+        if upside_pct is not None:
+            if upside_pct >= 15:
+                upside_label = "High Upside"
+            elif upside_pct >= 5:
+                upside_label = "Moderate Upside"
+            else:
+                upside_label = "Limited / Downside"
+        else:
+            upside_label = "N/A"
+
+        # -------------- Technical Indicators ---------------
+        # Only the closes are kept here; the indicators themselves are computed afterwards in
+        # _compute_technicals, so this I/O stage never holds the CPU work up
+        if not hist.empty and len(hist) > 200:
+            # One writable float64 array; every indicator later works on this same buffer
+            close_prices = hist["Close"].to_numpy(dtype=np.float64, copy=True)
+        else:
+            close_prices = None
+
+        # ---------------- ESG DATA ----------------
+        esg_total = esg_env = esg_social = esg_gov = esg_percentile = None
+
+        try:
+            esg = get_ticker_data(ticker, "sustainability")
+
+            scores = _statement_rows(esg, ESG_ROWS)
+            scores = {k: v[0] for k, v in scores.items() if len(v) > 0}
+
+            esg_total = scores.get("totalEsg")
+            esg_env = scores.get("environmentScore")
+            esg_social = scores.get("socialScore")
+            esg_gov = scores.get("governanceScore")
+            esg_percentile = scores.get("percentile")
+
+        except Exception as e:
+            print(f"ESG unavailable for {ticker}: {str(e)[:100]}")
+
+        # Raw numbers only; format_for_display turns them into the dashboard strings afterwards
+        data = {
+            "Ticker": ticker,
+            "Current Price": current_price,
+
+            # --- Valuation ---
+            "PE Ratio": pe_ratio,
+            "Market Cap": market_cap,
+            "Dividend Yield": dividend_yield,
+
+            # --- Financial Performance ---
+            "Gross Profit": grossProfit,
+            "Operating Income": operatingIncome,
+            "Net Income": netIncome,
+
+            # --- Balance Sheet ---
+            "Total Cash": totalCash,
+            "Total Debt": totalDebt,
+            "Debt to Equity": totalDebtToEquity,
+
+            # --- Cash Flow ---
+            "Free Cash Flow": freeCashflow,
+            "Operating Cash Flow": operatingCashflow,
+
+            # --- Growth Metrics ---
+            "Earnings Growth YoY": earnings_growth,
+            "Revenue Growth YoY": revenue_growth,
+            "Earnings QoQ Growth": earnings_q_growth,
+            "Revenue QoQ Growth": revenue_q_growth,
+
+            # --- Technicals ---
+            "RSI (14)": None,                                                   # Filled in by _compute_technicals
+            "SMA 20": None,
+            "SMA 50": None,
+            "SMA 200": None,
+            "MACD": None,
+            "Signal Line": None,
+
+            # --- Analyst Estimates ---
+            "Strong Buy": strong_buy,
+            "Buy": buy,
+            "Hold": hold,
+            "Sell": sell,
+            "Strong Sell": strong_sell,
+            "Total Analysts (Breakdown)": total_analysts,
+            "Target Mean": target_mean,
+            "Target High": target_high,
+            "Target Low": target_low,
+            "Upside %": upside_pct,
+            "Upside View": upside_label,
+
+            # --- ESG Scores ---
+            "ESG Total Score": esg_total,
+            "ESG Environment": esg_env,
+            "ESG Social": esg_social,
+            "ESG Governance": esg_gov,
+            "ESG Percentile": esg_percentile,
+
+            "_close": close_prices,                                             # Dropped again by _compute_technicals
+        }
+
+        print(f"✅ Successfully processed {ticker}")
+        return data
+
+    except Exception as e:                                                      # If stock data fetching fails
+        print(f"❌ Error fetching {ticker}: {e}")
+        return {
+            "Ticker": ticker,
+            "Error Message": str(e)[:100]                                       # format_for_display marks the row as "Error"
+        }
+
+
+# --------------------------------------- Technical indicators (CPU stage) ------------------------------------------
+# Runs after every ticker has been fetched, in-process. The row dicts only carry floats and one
+# numpy array of closes, which the indicators consume and drop.
+
+def _compute_technicals(row):
+    close_prices = row.pop("_close", None)                                      # Error rows never had one
+    if close_prices is not None:
+        # Only the latest bar is shown, so compute just the last value of each indicator
+        row["RSI (14)"] = calculate_rsi_last(close_prices)
+        row["MACD"], row["Signal Line"] = calculate_macd_last(close_prices)
+        row["SMA 20"], row["SMA 50"], row["SMA 200"] = calculate_sma_last_multi(close_prices, (20, 50, 200))
+    return row
+
+
+TECHNICAL_COLUMNS = ["RSI (14)", "MACD", "Signal Line", "SMA 20", "SMA 50", "SMA 200"]   # Order of calculate_technicals_batch
+
+
+def compute_technicals(rows):
+    if NUMBA_AVAILABLE:
+        # One compiled call for every ticker: the closes are packed into a single buffer and the
+        # kernel's prange loop runs the tickers in parallel on all cores, without the GIL
+        with_closes = [row for row in rows if row.get("_close") is not None]
+        values = calculate_technicals_batch([row["_close"] for row in with_closes])
+        for row, latest in zip(with_closes, values.tolist()):
+            row.update(zip(TECHNICAL_COLUMNS, latest))
+        for row in rows:
+            row.pop("_close", None)
+        return rows
+
+    # Without numba the indicators are pandas/scipy calls per ticker, run serially
+    return [_compute_technicals(row) for row in rows]
+
+
+# --------------------------------------- Display formatting ------------------------------------------
+# _process_ticker returns plain numbers so the DataFrame keeps float columns; format_for_display
+# produces the strings shown in the dashboard ("12.34B", "5.6%", "N/A") column by column at the end.
+
+BILLION_COLS = [                                                                    # Shown in billions, e.g. "12.34B"
+    "Market Cap", "Gross Profit", "Operating Income", "Net Income",
+    "Total Cash", "Total Debt", "Free Cash Flow", "Operating Cash Flow",
+]
+PERCENT_COLS = [                                                                    # Ratios shown as percentages, 0.056 -> "5.6%"
+    "Earnings Growth YoY", "Revenue Growth YoY", "Earnings QoQ Growth", "Revenue QoQ Growth",
+]
+ROUNDED_COLS = {                                                                    # Column: decimals; zero means "not reported"
+    "Current Price": 2, "PE Ratio": 2, "Dividend Yield": 4, "Debt to Equity": 2,
+    "Target Mean": 2, "Target High": 2, "Target Low": 2,
+}
+SCORE_COLS = [                                                                      # Rounded to 2 decimals; zero is a real value
+    "RSI (14)", "SMA 20", "SMA 50", "SMA 200", "MACD", "Signal Line",
+    "ESG Total Score", "ESG Environment", "ESG Social", "ESG Governance", "ESG Percentile",
+]
+COUNT_COLS = ["Strong Buy", "Buy", "Hold", "Sell", "Strong Sell", "Total Analysts (Breakdown)"]
+
+
+def _numeric(df, col, zero_is_missing=False):
+    values = pd.to_numeric(df[col], errors="coerce")
+    return values.mask(values == 0) if zero_is_missing else values
+
+
+def _round(values, decimals):
+    # Python's round(), as the per-ticker code used. Series.round() scales by 10**decimals and
+    # rounds half to even, so 12.345 would show as 12.34 instead of 12.35
+    return values.map(lambda v: round(v, decimals), na_action="ignore")
+
+
+def format_for_display(df):
+    """Turn the numeric columns from fetch_stock_data_with_indicators into dashboard strings"""
+
+    df = df.copy()
+    present = set(df.columns)
+
+    for col in BILLION_COLS:
+        if col in present:
+            values = _numeric(df, col, zero_is_missing=True)
+            df[col] = (_round(values / 1e9, 2).astype(str) + "B").where(values.notna(), "N/A")
+
+    for col in PERCENT_COLS:
+        if col in present:
+            values = _numeric(df, col, zero_is_missing=True)
+            df[col] = (_round(values * 100, 2).astype(str) + "%").where(values.notna(), "N/A")
+
+    if "Upside %" in present:                                                       # Already in percentage points
+        values = _numeric(df, "Upside %")
+        df["Upside %"] = (_round(values, 2).astype(str) + "%").where(values.notna(), "N/A")
+
+    for col, decimals in ROUNDED_COLS.items():
+        if col in present:
+            values = _numeric(df, col, zero_is_missing=True)
+            df[col] = _round(values, decimals).astype(object).where(values.notna(), "N/A")
+
+    for col in SCORE_COLS:
+        if col in present:
+            values = _numeric(df, col)
+            df[col] = _round(values, 2).astype(object).where(values.notna(), "N/A")
+
+    for col in COUNT_COLS:
+        if col in present:
+            values = _numeric(df, col)
+            df[col] = values.astype("Int64").astype(object).where(values.notna(), "N/A")
+
+    # Tickers that failed to fetch only carry an error message
+    if "Error Message" in present:
+        df.loc[df["Error Message"].notna(), "Current Price"] = "Error"
+
+    return df
+
+
+def fetch_stock_data_with_indicators(tickers, max_workers=MAX_WORKERS):
+    if not tickers:                                                                 # Nothing to fetch
+        return pd.DataFrame()
+
+    # Price history for every ticker comes back from a single batched request
+    hist_all = download_history(tickers)
+    histories = [_history_for(hist_all, ticker) for ticker in tickers]
+
+    # Each ticker is independent and almost all of the time is spent waiting on Yahoo,
+    # so fetch them concurrently. ex.map keeps the results in the same order as tickers.
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as ex:
+        raw_data = list(ex.map(_process_ticker, tickers, histories))
+
+    # The indicator maths is CPU work, so it runs as its own stage once the network part is done
+    all_data = compute_technicals(raw_data)
+
+    return format_for_display(pd.DataFrame(all_data))
 # --------------------------------------- Main Funtion  ------------------------------------------
 def main():
 
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    excel_path = os.path.join(base_dir, "Stock_data.xlsm")
+    excel_path = DEFAULT_EXCEL_PATH
+
+    # Open the workbook once and read both input sheets from it
+    workbook = open_workbook(excel_path)
+    source = workbook if workbook is not None else excel_path
 
     # Step 1: Read stock tickers
-    tickers = get_tickers_from_excel(excel_path)                                              
+    tickers = get_tickers_from_excel(source)                                              
     print(" Tickers found:", tickers)
 
-    # Step 2: Fetch stock data & indicators 
+    # 2. Read Manual ESG
+    manual_esg_df = read_manual_esg(source)
+
+    if workbook is not None:
+        workbook.close()
+
+    # Step 3: Fetch stock data & indicators 
     df = fetch_stock_data_with_indicators(tickers)                                  
     print(df)
 
-    # 3. Read Manual ESG
-    manual_esg_df = read_manual_esg(excel_path)
-
     # 4. LEFT JOIN (no row loss, no overwrite)
     final_df = df.merge(
         manual_esg_df,
@@ -430,7 +724,7 @@ def main():
     print(final_df)
 
     #Save to Excel for verification
-    # output_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stock_data_output.xlsx")
+    # output_path = os.path.join(BASE_DIR, "stock_data_output.xlsx")
     # final_df.to_excel(output_path, index=False)
     # print(f"📁 Saved to {output_path}")
 
@@ -1,35 +1,278 @@
+import numpy as np
 import pandas as pd
 
+try:
+    from _njit import njit, prange, NUMBA_AVAILABLE
+except ImportError:
+    from ._njit import njit, prange, NUMBA_AVAILABLE
+
+lfilter = None
+if not NUMBA_AVAILABLE:                                             # scipy is only needed without numba; importing it costs ~0.6s
+    try:
+        from scipy.signal import lfilter                            # C implementation of the EMA recursion when numba is missing
+    except ImportError:
+        pass
+
+
+# The kernels below are given explicit signatures so numba compiles them when this module is
+# imported (and caches the machine code in __pycache__), instead of on the first call.
+
+
+def _as_kernel_input(close_prices):
+    # The compiled signatures take writable, contiguous float64 arrays; pandas may hand
+    # out read-only views, so copy only when needed.
+    return np.require(np.asarray(close_prices, dtype=np.float64), requirements=["C", "W"])
+
+
+@njit("float64[:](float64[:], int64)", cache=True)
+def _rsi_kernel(close, period):
+    # One pass over the closes: keep running sums of the gains/losses inside the
+    # window instead of building diff/where/rolling intermediates.
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    gain_sum = 0.0
+    loss_sum = 0.0
+
+    for i in range(n):
+        if i > 0:
+            delta = close[i] - close[i - 1]
+            if delta > 0:
+                gain_sum += delta
+            elif delta < 0:
+                loss_sum -= delta
+
+        # Drop the change that just left the window (the first bar has no change)
+        j = i - period
+        if j > 0:
+            delta = close[j] - close[j - 1]
+            if delta > 0:
+                gain_sum -= delta
+            elif delta < 0:
+                loss_sum += delta
+
+        if i >= period - 1:
+            avg_gain = gain_sum / period
+            avg_loss = loss_sum / period
+            if avg_loss != 0:
+                out[i] = 100 - (100 / (1 + avg_gain / avg_loss))
+            elif avg_gain != 0:
+                out[i] = 100.0
+
+    return out
+
+
 def calculate_rsi(close_prices, period=14):
-    delta = close_prices.diff()
+    close = _as_kernel_input(close_prices)
+    rsi = _rsi_kernel(close, period)
 
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
+    return pd.Series(rsi, index=close_prices.index)
 
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+def calculate_rsi_last(close_prices, period=14):
+    # Only the latest RSI is needed and it depends on the last `period` price changes,
+    # so run the kernel over just the tail instead of the whole history.
+    close = np.asarray(close_prices, dtype=np.float64)
+    tail = _as_kernel_input(close[-(period + 1):])
+    if tail.shape[0] == 0:
+        return np.nan
 
-    return rsi
+    return float(_rsi_kernel(tail, period)[-1])
 
 
 
-def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
-    ema_short = close_prices.ewm(span=short_window, adjust=False).mean()
-    ema_long = close_prices.ewm(span=long_window, adjust=False).mean()
+@njit("UniTuple(float64, 2)(float64, float64, float64, float64)", cache=True)
+def _ewm_update(ema, old_wt, x, alpha):
+    # One step of pandas' ewm(adjust=False).mean(), including how it treats NaN gaps
+    if ema != ema:                                  # No observation yet
+        if x == x:
+            ema = x
+    else:
+        old_wt *= 1 - alpha
+        if x == x:
+            if ema != x:
+                ema = (old_wt * ema + alpha * x) / (old_wt + alpha)
+            old_wt = 1.0
+    return ema, old_wt
+
+
+@njit("UniTuple(float64[:], 3)(float64[:], int64, int64, int64)", cache=True)
+def _macd_kernel(close, short_window, long_window, signal_window):
+    # Short EMA, long EMA and the signal EMA of their difference, all in one loop
+    n = close.shape[0]
+    macd = np.empty(n)
+    signal = np.empty(n)
+    histogram = np.empty(n)
+
+    a_short = 2.0 / (short_window + 1)
+    a_long = 2.0 / (long_window + 1)
+    a_signal = 2.0 / (signal_window + 1)
+    ema_short = ema_long = ema_signal = np.nan
+    wt_short = wt_long = wt_signal = 1.0
 
-    macd = ema_short - ema_long
-    signal = macd.ewm(span=signal_window, adjust=False).mean()
-    histogram = macd - signal
+    for i in range(n):
+        ema_short, wt_short = _ewm_update(ema_short, wt_short, close[i], a_short)
+        ema_long, wt_long = _ewm_update(ema_long, wt_long, close[i], a_long)
+        macd[i] = ema_short - ema_long
+        ema_signal, wt_signal = _ewm_update(ema_signal, wt_signal, macd[i], a_signal)
+        signal[i] = ema_signal
+        histogram[i] = macd[i] - ema_signal
 
     return macd, signal, histogram
 
 
+def _ema(close, span):
+    # ewm(span, adjust=False).mean() as the linear filter y[i] = a*x[i] + (1-a)*y[i-1],
+    # seeded so that y[0] = x[0]. Only valid when there are no NaNs.
+    alpha = 2.0 / (span + 1)
+    ema, _ = lfilter([alpha], [1.0, alpha - 1.0], close, zi=[(1.0 - alpha) * close[0]])
+    return ema
+
+
+def _use_lfilter(close):
+    # Without numba the kernels run as plain Python loops, so prefer scipy's lfilter.
+    # lfilter cannot reproduce pandas' NaN handling, so gaps still go through the kernel.
+    return not NUMBA_AVAILABLE and lfilter is not None and close.shape[0] > 0 and not np.isnan(close).any()
+
+
+def _macd_arrays(close, short_window, long_window, signal_window):
+    if _use_lfilter(close):
+        macd = _ema(close, short_window) - _ema(close, long_window)
+        signal = _ema(macd, signal_window)
+        return macd, signal, macd - signal
+
+    return _macd_kernel(close, short_window, long_window, signal_window)
+
+
+def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
+    close = _as_kernel_input(close_prices)
+    macd, signal, histogram = _macd_arrays(close, short_window, long_window, signal_window)
+
+    index = close_prices.index
+    return pd.Series(macd, index=index), pd.Series(signal, index=index), pd.Series(histogram, index=index)
+
+
+@njit("UniTuple(float64, 2)(float64[:], int64, int64, int64)", cache=True)
+def _macd_last_kernel(close, short_window, long_window, signal_window):
+    # Same recursion as _macd_kernel but keeps only the running scalars
+    a_short = 2.0 / (short_window + 1)
+    a_long = 2.0 / (long_window + 1)
+    a_signal = 2.0 / (signal_window + 1)
+    ema_short = ema_long = ema_signal = np.nan
+    wt_short = wt_long = wt_signal = 1.0
+    macd = np.nan
+
+    for i in range(close.shape[0]):
+        ema_short, wt_short = _ewm_update(ema_short, wt_short, close[i], a_short)
+        ema_long, wt_long = _ewm_update(ema_long, wt_long, close[i], a_long)
+        macd = ema_short - ema_long
+        ema_signal, wt_signal = _ewm_update(ema_signal, wt_signal, macd, a_signal)
+
+    return macd, ema_signal
+
+
+def calculate_macd_last(close_prices, short_window=12, long_window=26, signal_window=9):
+    close = _as_kernel_input(close_prices)
+    if _use_lfilter(close):
+        macd, signal, _ = _macd_arrays(close, short_window, long_window, signal_window)
+        return float(macd[-1]), float(signal[-1])
+
+    macd, signal = _macd_last_kernel(close, short_window, long_window, signal_window)
+
+    return float(macd), float(signal)
+
+
 def calculate_sma(close_prices, window=20):
-    return close_prices.rolling(window=window).mean()
+    close = close_prices.to_numpy(dtype=np.float64)
+    sma = np.full(close.shape[0], np.nan)
+
+    if close.shape[0] >= window:
+        # Window sums from prefix sums: sum(x[i-w+1..i]) = cs[i+1] - cs[i+1-w].
+        # NaNs are counted separately so a gap only blanks the windows it falls in, like rolling().mean().
+        missing = np.isnan(close)
+        cs = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, close))))
+        gaps = np.concatenate(([0], np.cumsum(missing)))
+
+        sums = cs[window:] - cs[:-window]
+        has_gap = (gaps[window:] - gaps[:-window]) > 0
+        sma[window - 1:] = np.where(has_gap, np.nan, sums / window)
+
+    return pd.Series(sma, index=close_prices.index)
+
+
+@njit("float64(float64[:], int64)", cache=True)
+def _sma_last_kernel(close, window):
+    n = close.shape[0]
+    if n < window:
+        return np.nan
+
+    total = 0.0
+    for i in range(n - window, n):
+        total += close[i]                                           # NaN if the window has a gap, like rolling().mean()
+    return total / window
+
+
+def calculate_sma_last(close_prices, window=20):
+    close = _as_kernel_input(close_prices)
+    return float(_sma_last_kernel(close, window))
+
+
+def calculate_sma_last_multi(close_prices, windows=(20, 50, 200)):
+    # One cumulative sum over the newest bars, taken from the end backwards, gives the sum of
+    # the last w closes at position w-1 for every window at once. NaNs are counted separately
+    # so only windows that contain a gap come out NaN.
+    close = np.asarray(close_prices, dtype=np.float64)
+    tail = close[-max(windows):][::-1]
+    missing = np.isnan(tail)
+    sums = np.cumsum(np.where(missing, 0.0, tail))
+    gaps = np.cumsum(missing)
+
+    return tuple(
+        float(sums[w - 1] / w) if w <= tail.shape[0] and not gaps[w - 1] else np.nan
+        for w in windows
+    )
+
+
+@njit("float64[:, :](float64[:], int64[:], int64, int64, int64, int64, int64[:])", parallel=True, cache=True)
+def _technicals_batch_kernel(closes, offsets, rsi_period, short_window, long_window, signal_window, sma_windows):
+    # Ticker k owns closes[offsets[k]:offsets[k + 1]]. Tickers are independent, so prange
+    # spreads them over all cores (numba releases the GIL inside the parallel loop).
+    n = offsets.shape[0] - 1
+    out = np.full((n, 3 + sma_windows.shape[0]), np.nan)
+
+    for k in prange(n):
+        close = closes[offsets[k]:offsets[k + 1]]
+        if close.shape[0] == 0:
+            continue
+
+        out[k, 0] = _rsi_kernel(close[-(rsi_period + 1):], rsi_period)[-1]
+        out[k, 1], out[k, 2] = _macd_last_kernel(close, short_window, long_window, signal_window)
+        for j in range(sma_windows.shape[0]):
+            out[k, 3 + j] = _sma_last_kernel(close, sma_windows[j])
+
+    return out
 
 
+def calculate_technicals_batch(close_arrays, rsi_period=14, short_window=12, long_window=26,
+                               signal_window=9, sma_windows=(20, 50, 200)):
+    # Latest RSI, MACD, signal line and SMAs for many tickers in one call.
+    # Returns an array with one row per input: [rsi, macd, signal, sma_w1, sma_w2, ...]
+    if not NUMBA_AVAILABLE:
+        # The kernel would run as plain Python; the single-ticker helpers are faster here
+        rows = [
+            (calculate_rsi_last(c, rsi_period),
+             *calculate_macd_last(c, short_window, long_window, signal_window),
+             *calculate_sma_last_multi(c, sma_windows))
+            for c in close_arrays
+        ]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), 3 + len(sma_windows))
 
+    # All closes in one flat buffer plus where each ticker starts and ends
+    lengths = [len(c) for c in close_arrays]
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    closes = np.concatenate(close_arrays) if close_arrays else np.empty(0)
 
+    return _technicals_batch_kernel(
+        _as_kernel_input(closes), offsets, rsi_period, short_window, long_window, signal_window,
+        np.asarray(sma_windows, dtype=np.int64),
+    )
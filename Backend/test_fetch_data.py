@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetch_data import (
+    format_for_display, BILLION_COLS, PERCENT_COLS, ROUNDED_COLS, SCORE_COLS, COUNT_COLS,
+)
+
+# format_for_display replaced the per-ticker formatting in fetch_stock_data_with_indicators;
+# these tests compare it with that original row-by-row logic
+
+
+# ---------------------------------------------- Original per-value formatting ----------------------------------------------
+# None and NaN both mean "not reported" (the original code only ever saw None)
+
+def _missing(v):
+    return v is None or (isinstance(v, float) and math.isnan(v))
+
+
+def baseline_billions(v):
+    return "N/A" if _missing(v) or not v else f"{round(v / 1e9, 2)}B"
+
+
+def baseline_percent(v):
+    return "N/A" if _missing(v) or not v else f"{round(v * 100, 2)}%"
+
+
+def baseline_upside(v):
+    return "N/A" if _missing(v) else f"{round(v, 2)}%"
+
+
+def baseline_rounded(v, decimals):
+    return "N/A" if _missing(v) or not v else round(v, decimals)
+
+
+def baseline_score(v):
+    return "N/A" if _missing(v) else round(v, 2)
+
+
+def baseline_count(v):
+    return "N/A" if _missing(v) else int(v)
+
+
+def baseline_row(row):
+    out = {}
+    for col in BILLION_COLS:
+        out[col] = baseline_billions(row[col])
+    for col in PERCENT_COLS:
+        out[col] = baseline_percent(row[col])
+    out["Upside %"] = baseline_upside(row["Upside %"])
+    for col, decimals in ROUNDED_COLS.items():
+        out[col] = baseline_rounded(row[col], decimals)
+    for col in SCORE_COLS:
+        out[col] = baseline_score(row[col])
+    for col in COUNT_COLS:
+        out[col] = baseline_count(row[col])
+    return out
+
+
+ALL_COLS = BILLION_COLS + PERCENT_COLS + ["Upside %"] + list(ROUNDED_COLS) + SCORE_COLS + COUNT_COLS
+
+
+def assert_same_as_baseline(rows):
+    result = format_for_display(pd.DataFrame(rows, columns=ALL_COLS))
+    for i, row in enumerate(rows):
+        expected = baseline_row(dict(zip(ALL_COLS, row)))
+        for col, value in expected.items():
+            assert result.at[i, col] == value, (i, col, row[ALL_COLS.index(col)])
+
+
+# ---------------------------------------------- Tests ----------------------------------------------
+
+@pytest.mark.parametrize("value", [
+    None, np.nan, 0, 0.0, -0.0, 1, -1, 0.004, -0.004, 0.005, 12.345, -12.345, 1e9, -2.5e9, 123456789012.0,
+])
+def test_format_for_display_edge_values(value):
+    count = value if _missing(value) else float(round(value))                  # Analyst counts are whole numbers
+    assert_same_as_baseline([[count if col in COUNT_COLS else value for col in ALL_COLS]])
+
+
+def test_format_for_display_random_rows():
+    rng = np.random.default_rng(0)
+    scales = {col: 1e11 for col in BILLION_COLS} | {col: 1.0 for col in PERCENT_COLS}
+    rows = []
+    for _ in range(500):
+        row = []
+        for col in ALL_COLS:
+            kind = rng.integers(6)
+            if kind == 0:
+                row.append(None)
+            elif kind == 1:
+                row.append(0.0)
+            elif col in COUNT_COLS:
+                row.append(float(rng.integers(0, 40)))
+            else:
+                row.append(float(rng.normal(0, scales.get(col, 100.0))))
+        rows.append(row)
+    assert_same_as_baseline(rows)
+
+
+def test_format_for_display_marks_error_rows():
+    df = pd.DataFrame({"Ticker": ["OK", "BAD"], "Current Price": [10.0, None], "Error Message": [None, "404"]})
+    result = format_for_display(df)
+    assert result["Current Price"].tolist() == [10.0, "Error"]
+
+
+def test_format_for_display_skips_missing_columns():
+    df = pd.DataFrame({"Ticker": ["AAA"], "RSI (14)": [55.556]})
+    result = format_for_display(df)
+    assert list(result.columns) == ["Ticker", "RSI (14)"]
+    assert result.at[0, "RSI (14)"] == 55.56
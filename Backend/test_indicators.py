@@ -0,0 +1,155 @@
+import importlib
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Compares the indicators against the original pandas formulas, once with the numba
+# kernels and once with the plain-Python/scipy fallback used when numba is missing
+# Run from the project root: python -m pytest Backend
+
+
+# ---------------------------------------------- Original pandas formulas ----------------------------------------------
+
+def baseline_rsi(close_prices, period=14):
+    delta = close_prices.diff()
+
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def baseline_macd(close_prices, short_window=12, long_window=26, signal_window=9):
+    ema_short = close_prices.ewm(span=short_window, adjust=False).mean()
+    ema_long = close_prices.ewm(span=long_window, adjust=False).mean()
+
+    macd = ema_short - ema_long
+    signal = macd.ewm(span=signal_window, adjust=False).mean()
+    return macd, signal, macd - signal
+
+
+def baseline_sma(close_prices, window=20):
+    return close_prices.rolling(window=window).mean()
+
+
+def last(series):
+    return series.iloc[-1] if len(series) else np.nan
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=np.float64), np.asarray(expected, dtype=np.float64),
+                               rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+# ---------------------------------------------- Test inputs ----------------------------------------------
+
+def random_walk(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 + np.cumsum(rng.normal(0, 1, n)), dtype=np.float64)
+
+
+def with_gaps(close_prices):
+    gapped = close_prices.copy()
+    gapped.iloc[[3, 40, 41, 42, 150]] = np.nan                  # Single missing bars and a short run
+    return gapped
+
+
+CASES = {
+    "random_walk": random_walk(300),
+    "nan_gaps": with_gaps(random_walk(300)),
+    "leading_nans": pd.concat([pd.Series([np.nan] * 5), random_walk(60)], ignore_index=True),
+    "flat": pd.Series([50.0] * 40),
+    "short": random_walk(10),
+    "single_bar": random_walk(1),
+    "empty": pd.Series([], dtype=np.float64),
+}
+
+
+@pytest.fixture(params=list(CASES), ids=list(CASES))
+def close(request):
+    return CASES[request.param]
+
+
+# ---------------------------------------------- numba / no-numba paths ----------------------------------------------
+
+def _load_indicators(use_numba, monkeypatch):
+    # Import indicators afresh, with numba hidden for the fallback path
+    if not use_numba:
+        monkeypatch.setitem(sys.modules, "numba", None)
+    for name in ("_njit", "indicators"):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return importlib.import_module("indicators")
+
+
+@pytest.fixture(params=[True, False], ids=["numba", "no_numba"])
+def ind(request, monkeypatch):
+    if request.param:
+        pytest.importorskip("numba")
+    module = _load_indicators(request.param, monkeypatch)
+    assert module.NUMBA_AVAILABLE is request.param
+    return module
+
+
+# ---------------------------------------------- Tests ----------------------------------------------
+
+def test_rsi(ind, close):
+    assert_matches(ind.calculate_rsi(close), baseline_rsi(close))
+
+
+def test_rsi_last(ind, close):
+    assert_matches(ind.calculate_rsi_last(close), last(baseline_rsi(close)))
+
+
+def test_macd(ind, close):
+    for actual, expected in zip(ind.calculate_macd(close), baseline_macd(close)):
+        assert_matches(actual, expected)
+
+
+def test_macd_last(ind, close):
+    macd, signal, _ = baseline_macd(close)
+    assert_matches(ind.calculate_macd_last(close), (last(macd), last(signal)))
+
+
+@pytest.mark.parametrize("window", [20, 50, 200])
+def test_sma(ind, close, window):
+    assert_matches(ind.calculate_sma(close, window), baseline_sma(close, window))
+
+
+@pytest.mark.parametrize("window", [20, 50, 200])
+def test_sma_last(ind, close, window):
+    assert_matches(ind.calculate_sma_last(close, window), last(baseline_sma(close, window)))
+
+
+def test_sma_last_multi(ind, close):
+    expected = [last(baseline_sma(close, w)) for w in (20, 50, 200)]
+    assert_matches(ind.calculate_sma_last_multi(close), expected)
+
+
+def test_technicals_batch(ind):
+    # One row per ticker: [rsi, macd, signal, sma20, sma50, sma200]
+    closes = list(CASES.values())
+    expected = [
+        [last(baseline_rsi(c)), *(last(s) for s in baseline_macd(c)[:2]),
+         *(last(baseline_sma(c, w)) for w in (20, 50, 200))]
+        for c in closes
+    ]
+    assert_matches(ind.calculate_technicals_batch([c.to_numpy() for c in closes]), expected)
+
+
+def test_technicals_batch_no_tickers(ind):
+    assert ind.calculate_technicals_batch([]).shape == (0, 6)
+
+
+@pytest.mark.parametrize("span", [9, 12, 26])
+def test_lfilter_ema(monkeypatch, span):
+    # scipy's lfilter EMA serves gap-free closes when numba is missing
+    pytest.importorskip("scipy")
+    ind = _load_indicators(False, monkeypatch)
+    close = CASES["random_walk"]
+    assert_matches(ind._ema(close.to_numpy(), span), close.ewm(span=span, adjust=False).mean())
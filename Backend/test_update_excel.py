@@ -0,0 +1,213 @@
+import os
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from openpyxl.styles import NamedStyle, Font
+
+pytest.importorskip("xlwings")                                  # update_excel imports it at module level
+import update_excel
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Stock_data.xlsm")
+
+
+@pytest.fixture
+def workbook_copy(tmp_path):
+    path = tmp_path / "Stock_data.xlsm"
+    shutil.copy(WORKBOOK, path)
+    return str(path)
+
+
+def sample_df():
+    return pd.DataFrame({
+        "Ticker": ["AAA", "BBB"],
+        "Current Price": [10.5, -2.0],
+        "RSI (14)": [25.0, "N/A"],
+    })
+
+
+# ---------------------------------------------- write_rawdata_file ----------------------------------------------
+
+def test_write_rawdata_file_replaces_borderless_styles(workbook_copy):
+    # The xlwings path creates the same style names without borders
+    wb = load_workbook(workbook_copy, keep_vba=True)
+    for name in ("RawData Header", "RawData Body", "RawData Ticker"):
+        if name not in wb.named_styles:
+            wb.add_named_style(NamedStyle(name, font=Font(size=10)))
+    wb.save(workbook_copy)
+
+    update_excel.write_rawdata_file(workbook_copy, sample_df())
+
+    ws = load_workbook(workbook_copy)["RawData"]
+    for ref in ("A1", "A2", "B2", "C3"):
+        assert ws[ref].border.left is not None and ws[ref].border.left.style == "thin", ref
+
+
+def rawdata_df():
+    return pd.DataFrame({
+        "Ticker": ["AAA", "AAA", "BBB"],
+        "Current Price": [10.5, 10.5, "N/A"],
+        "Dividend Yield": [0.02, 0.02, -0.01],
+        "Upside %": ["12.5%", "12.5%", "-3.2%"],
+        "RSI (14)": [25.0, 25.0, "N/A"],
+        "Review Date": pd.to_datetime(["2026-01-05", "2026-02-10", None]),
+    })
+
+
+def test_write_rawdata_file_round_trip(workbook_copy):
+    update_excel.write_rawdata_file(workbook_copy, rawdata_df())
+    update_excel.write_rawdata_file(workbook_copy, rawdata_df())           # A re-run must not stack rules or styles
+
+    with zipfile.ZipFile(workbook_copy) as archive:
+        assert "xl/vbaProject.bin" in archive.namelist()
+
+    wb = load_workbook(workbook_copy, keep_vba=True)
+    assert wb.vba_archive is not None
+    assert [n for n in wb.named_styles if n.startswith("RawData")] == [
+        "RawData Header", "RawData Body", "RawData Ticker", "RawData Date",
+    ]
+
+    ws = wb["RawData"]
+    assert [c.value for c in ws[1]] == list(rawdata_df().columns)
+    assert ws["B2"].value == 10.5 and ws["B4"].value == "N/A"
+    assert ws["F4"].value is None                                           # NaT -> empty cell
+    assert ws["A1"].style == "RawData Header"
+    assert ws["A2"].style == "RawData Ticker"
+    assert ws["B2"].style == "RawData Body"
+    assert ws["F2"].style == "RawData Date" and ws["F2"].number_format == "yyyy-mm-dd"
+    assert ws.freeze_panes == "C2"
+
+    rules = {
+        str(cf.sqref): sorted(rule.formula[0] for rule in cf.rules)
+        for cf in ws.conditional_formatting
+    }
+    assert rules == {
+        "C2:C4": ["IFERROR(VALUE(C2)<0,FALSE)", "IFERROR(VALUE(C2)>0,FALSE)"],
+        "D2:D4": ["IFERROR(VALUE(D2)<0,FALSE)", "IFERROR(VALUE(D2)>0,FALSE)"],
+        "E2:E4": ["IFERROR(VALUE(E2)<30,FALSE)", "IFERROR(VALUE(E2)>70,FALSE)"],
+    }
+
+
+# ---------------------------------------------- Calculated columns ----------------------------------------------
+# The original row-by-row classifiers, before bucketize
+
+def baseline_upside_bucket(val):
+    try:
+        if val == "N/A" or pd.isna(val):
+            return "N/A"
+        num = float(val.replace("%", "")) / 100
+        if num >= 0.10:
+            return "High (>10%)"
+        elif num >= 0:
+            return "Medium (0–10%)"
+        else:
+            return "Negative"
+    except Exception:
+        return "N/A"
+
+
+def baseline_esg_category(val):
+    try:
+        if val == "N/A" or pd.isna(val):
+            return "N/A"
+        score = float(val)
+        if score >= 60:
+            return "Good (≥60)"
+        elif score >= 40:
+            return "Average (40–59)"
+        else:
+            return "Poor (<40)"
+    except Exception:
+        return "N/A"
+
+
+def baseline_rsi_status(val):
+    try:
+        if val == "N/A" or pd.isna(val):
+            return "N/A"
+        rsi = float(val)
+        if rsi > 70:
+            return "Overbought (>70)"
+        elif rsi < 30:
+            return "Oversold (<30)"
+        else:
+            return "Neutral"
+    except Exception:
+        return "N/A"
+
+
+def test_add_upside_bucket():
+    values = ["N/A", None, np.nan, "abc", "", "-0.01%", "-12.5%", "0%", "0.0%", "9.99%", "10%", "10.0%", "10.01%", "250%"]
+    df = update_excel.add_upside_bucket(pd.DataFrame({"Upside %": values}))
+    assert df["Upside Bucket"].tolist() == [baseline_upside_bucket(v) for v in values]
+
+
+def test_add_esg_category():
+    values = ["N/A", None, np.nan, "abc", -5, 0, 39.99, 40, "40", 59.99, 60, 60.0, 100]
+    df = update_excel.add_esg_category(pd.DataFrame({"Manual ESG Score": values}, dtype=object))
+    assert df["ESG Category"].tolist() == [baseline_esg_category(v) for v in values]
+
+
+def test_add_rsi_status():
+    values = ["N/A", None, np.nan, "abc", -1, 0, 29.99, 30, 30.0, 50, 70, 70.0, 70.0001, 100]
+    df = update_excel.add_rsi_status(pd.DataFrame({"RSI (14)": values}, dtype=object))
+    assert df["RSI Status"].tolist() == [baseline_rsi_status(v) for v in values]
+
+
+# ---------------------------------------------- Repeated ticker rows ----------------------------------------------
+
+def baseline_blank_repeated(df):
+    # The original sheet-level loop: a row repeating the previous row's ticker
+    # keeps only its ESG columns
+    rows = df.astype(object).where(df.notna(), None).values.tolist()
+    prev_ticker = None
+    ticker_idx = list(df.columns).index("Ticker")
+    for row in rows:
+        current_ticker = row[ticker_idx]
+        if current_ticker == prev_ticker:
+            for i, col in enumerate(df.columns):
+                if col not in update_excel.ESG_ONLY_COLUMNS:
+                    row[i] = None
+        else:
+            prev_ticker = current_ticker
+    return rows
+
+
+def test_blank_repeated_ticker_rows():
+    df = pd.DataFrame({
+        "Ticker": ["AAA", "AAA", "AAA", "BBB", "AAA", "CCC", "CCC"],
+        "Current Price": [1.0, 1.0, 1.0, np.nan, 1.0, -2.0, -2.0],
+        "Upside %": ["5%", "5%", "5%", "N/A", "5%", "-1%", "-1%"],
+        "ESG Theme": ["Climate", "Water", "Labour", "Climate", "Water", None, "Climate"],
+        "Manual ESG Score": [70, 55, np.nan, 20, 55, 40, 61],
+        "Upside Bucket": ["Medium (0–10%)"] * 3 + ["N/A"] + ["Medium (0–10%)"] + ["Negative"] * 2,
+    })
+    result = update_excel.blank_repeated_ticker_rows(df)
+
+    assert update_excel.sheet_values(result)[1:] == baseline_blank_repeated(df)
+    assert result["Ticker"].tolist() == ["AAA", None, None, "BBB", "AAA", "CCC", None]
+
+
+def test_blank_repeated_ticker_rows_without_repeats():
+    df = pd.DataFrame({"Ticker": ["AAA"], "Current Price": [1.0], "ESG Theme": ["Climate"]})
+    pd.testing.assert_frame_equal(update_excel.blank_repeated_ticker_rows(df), df)
+
+
+# ---------------------------------------------- Sheet values ----------------------------------------------
+
+def test_sheet_values():
+    df = pd.DataFrame({
+        "Ticker": ["AAA", None],
+        "Price": [1.5, np.nan],
+        "Count": pd.array([3, None], dtype="Int64"),
+        "Date": pd.to_datetime(["2026-01-05", None]),
+        "Text": ["N/A", "x"],
+    })
+    values = update_excel.sheet_values(df)
+
+    assert values[0] == ["Ticker", "Price", "Count", "Date", "Text"]
+    assert values[1] == ["AAA", 1.5, 3, pd.Timestamp("2026-01-05"), "N/A"]
+    assert values[2] == [None, None, None, None, "x"]
@@ -1,8 +1,17 @@
 #------------------------------------------------------------------------- Step 1. Improt Libraries ------------------------------------------------------
 import sys                                                                  # System library - used to manipulate Python's module search paths (sys.path)   
 import os                                                                   # Operating system interface - used for file path operations and directory navigation
+import traceback                                                            # Prints the full error report when the update fails
+import threading                                                            # Lock around the cached Excel connection
 import xlwings as xw                                                       # Excel automation library - allows Python to control Excel through COM interface
 import pandas as pd                                                       # Data analysis library - used for data manipulation with DataFrames
+import numpy as np                                                        # Used for the infinite bin edges of the calculated columns
+from openpyxl.utils import get_column_letter                              # Converts column number (1, 2, 3) to Excel letters (A, B, C)
+from openpyxl import load_workbook                                        # Writes RawData straight into the file when Excel isn't running
+from openpyxl.styles import NamedStyle, Font, PatternFill, Border, Side, Alignment
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.formatting.formatting import ConditionalFormattingList
+from contextlib import contextmanager                                     # Used to switch Excel into batch mode around bulk writes
 
 
 #------------------------------------------------------ Step 1.1 Display settings (for debugging / console output) ------------------------------------------------------
@@ -21,13 +30,20 @@ if scripts_dir not in sys.path:                                                #
     sys.path.append(scripts_dir)
 
 
+#--------------------------------------------------------------------- Step 1.3 Run settings ------------------------------------------------------------------------------
+FETCH_WORKERS = 16                                                            # Tickers fetched from Yahoo Finance at the same time
+USE_CSV_SIDECAR = False                                                       # True: load RawData from a CSV via an Excel QueryTable
+CSV_SIDECAR_NAME = "RawData.csv"                                              # Written next to Stock_data.xlsm when USE_CSV_SIDECAR is on
+
+
 #---------------------------------------------------------------- Step 2 Import custom helper functions ---------------------------------------------------------------------
 try:
     # Import specific functions from fetch_data.py module
     from fetch_data import (
         fetch_stock_data_with_indicators,  # Function to get stock data with technical indicators
         get_tickers_from_excel,            # Function to read ticker symbols from Excel
-        read_manual_esg                    # Function to read ESG data from Manual_ESG sheet
+        read_manual_esg,                   # Function to read ESG data from Manual_ESG sheet
+        open_workbook                      # Function to open the workbook once for both readers
     )
     print("✅ Successfully imported fetch_data functions")
 except ImportError:
@@ -36,34 +52,89 @@ except ImportError:
     sys.exit()  # Terminate the program with exit code 1
 
 
+#---------------------------------------------------------------- Step 2.1 Excel batch mode ---------------------------------------------------------------------
+@contextmanager
+def _excel_batch_mode(app):
+    """
+    Turns off screen redraws, recalculation, alert pop-ups and VBA events while
+    a block of writes runs, then puts back whatever the user had before (even on error).
+    """
+    saved = (app.screen_updating, app.calculation, app.display_alerts, app.enable_events)
+    app.screen_updating = False                                                   # Don't repaint the sheet after every write
+    app.calculation = "manual"                                                    # Don't recalculate formulas after every write
+    app.display_alerts = False                                                    # Don't stop on Excel dialogs
+    app.enable_events = False                                                     # Don't fire workbook VBA event handlers on every write
+    try:
+        yield app
+    finally:
+        app.screen_updating, app.calculation, app.display_alerts, app.enable_events = saved
+
+
 #-------------------------------------------------------------------- Step 3 Excel formatting function ------------------------------------------------------------------------
-def format_excel(sheet):
+def workbook_style(book_api, name):
+    """
+    Returns the workbook's named style called `name`, adding it the first time.
+    Only font, fill and alignment come from the style, so applying it keeps the
+    cells' number formats (e.g. dates) and borders.
+    """
+    try:
+        style = book_api.Styles(name)                                            # Already in the workbook from an earlier run
+    except Exception:
+        style = book_api.Styles.Add(name)
+    style.IncludeNumber = False
+    style.IncludeBorder = False
+    style.IncludeProtection = False
+    return style
+
+
+def column_areas(letters, first_row, last_row):
+    """
+    Builds one multi-area address such as "D2:D50,F2:F50" for several columns,
+    so a property can be set on all of them with a single sheet.api.Range call.
+    """
+    return ",".join(f"{c}{first_row}:{c}{last_row}" for c in letters)
+
+
+# Conditional formatting rules: (columns that share the rules, [(test, font_color, bold)], label)
+# Each test compares the cell's value, e.g. ">0"; see cf_formula for how it becomes a formula
+CONDITIONAL_FORMATS = [
+    # PRICE MOVEMENT INDICATORS - Dividend Yield and Upside % share the same rules
+    (["Dividend Yield", "Upside %"], [
+        (">0", 0x4CAF50, True),                                                     # POSITIVE values: bright green, bold
+        ("<0", 0xF44336, True),                                                     # NEGATIVE values: bright red, bold
+    ], "price indicators"),
+
+    # TECHNICAL INDICATORS - RSI (between 30-70 remains white, the default color)
+    (["RSI (14)"], [
+        ("<30", 0x2196F3, False),                                                   # OVERSOLD (RSI < 30): bright blue
+        (">70", 0xFF9800, False),                                                   # OVERBOUGHT (RSI > 70): orange
+    ], "RSI"),
+]
+
+
+def cf_formula(cell, test):
+    """
+    Expression for a conditional-format rule: true when `cell` holds a number (or numeric
+    text such as "-3.2%") that passes `test`. A plain cell-value rule would also fire on
+    "N/A", because Excel ranks any text above any number.
+    """
+    return f"=IFERROR(VALUE({cell}){test},FALSE)"
+
+
+def format_excel(sheet, headers, last_row, last_col):
     """
     Applies visual formatting to Excel sheet without changing data values.
     This is presentation-only formatting for better readability.
+    headers are the column names in sheet order; last_row/last_col are 1-based.
     """
     print("🎨 Applying Excel formatting...")
 
-    # Import get_column_letter function from openpyxl
-    # Converts column number (1, 2, 3) to Excel letters (A, B, C)
-    from openpyxl.utils import get_column_letter
-
     # --------------------------------------------------
-    # Setup - Get sheet dimensions and headers
+    # Setup - Sheet dimensions and headers
     # --------------------------------------------------
 
-    # Read header names from first row: expand("right") gets all cells in row 1
-    # .value gets the cell value for each cell
-    # Creates list of column names like ["Ticker", "Current Price", ...]
-    headers = [c.value for c in sheet.range("A1").expand("right")]
-
-    # Find last used row: expand("down") from A1 gets all cells in column A
-    # .last_cell gets the last cell in that range, .row gets its row number
-    last_row = sheet.range("A1").expand("down").last_cell.row
-
-    # Find last used column: expand("right") from A1 gets all cells in row 1
-    # .last_cell gets the last cell, .column gets its column number
-    last_col = sheet.range("A1").expand("right").last_cell.column
+    # headers, last_row and last_col come from the DataFrame that was just written
+    # (see update_excel), so the sheet doesn't have to be scanned for them again
     
     # Check if there's actual data (not just header row)
     if last_row < 2:
@@ -74,83 +145,95 @@ def format_excel(sheet):
     # (row, column) format: (1, 1) = A1
     used_range = sheet.range((1, 1), (last_row, last_col))
 
-    # Helper function: Get the data range for a specific column by name
-    def col_range(col_name):
-        try:
-            # Find column index (1-based) by looking up column name in headers
-            idx = headers.index(col_name) + 1
-            # Return range from row 2 (first data row) to last_row in that column
-            return sheet.range((2, idx), (last_row, idx))
-        except ValueError:
-            # Column name not found in headers
-            print(f"⚠️ Column '{col_name}' not found in headers")
-            return None
+    # Look-up tables built once: column name → 1-based index, and → Excel letter (A, B, C)
+    idx = {h: i for i, h in enumerate(headers, start=1)}
+    letters = {h: get_column_letter(i) for h, i in idx.items()}
 
     # Helper function: Get Excel column letter (A, B, C) for a column name
     def col_letter(col_name):
-        try:
-            # headers.index gives 0-based index, +1 for 1-based, convert to letter
-            return get_column_letter(headers.index(col_name) + 1)
-        except ValueError:
+        letter = letters.get(col_name)
+        if letter is None:
             # Column name not found in headers
             print(f"⚠️ Column '{col_name}' not found in headers")
-            return None
+        return letter
+
+    # --------------------------------------------------
+    # CELL STYLES – defined once on the workbook, applied by name
+    # --------------------------------------------------
+    # A named style is one entry in the workbook no matter how many cells use it,
+    # and assigning it is one COM call per range instead of one per property.
+    # The names match the styles write_rawdata_file registers with openpyxl.
+    book = sheet.book.api
+
+    # Body: black background, white 10pt text, centered (0x000000 = black, 0xFFFFFF = white)
+    body = workbook_style(book, "RawData Body")
+    body.Interior.Color = 0x000000
+    body.Font.Color = 0xFFFFFF
+    body.Font.Size = 10
+    body.Font.Bold = False
+    body.HorizontalAlignment = -4108                                                # -4108 is Excel constant for xlCenter
+    body.VerticalAlignment = -4108
+
+    # Header: bold 11pt white text on dark blue (0x2E75B5)
+    header_style = workbook_style(book, "RawData Header")
+    header_style.Interior.Color = 0x2E75B5
+    header_style.Font.Color = 0xFFFFFF
+    header_style.Font.Size = 11
+    header_style.Font.Bold = True
+    header_style.HorizontalAlignment = -4108
+    header_style.VerticalAlignment = -4108
+
+    # Ticker: bold bright blue (0x4FC3F7) for visibility on black
+    ticker_style = workbook_style(book, "RawData Ticker")
+    ticker_style.Interior.Color = 0x000000
+    ticker_style.Font.Color = 0x4FC3F7
+    ticker_style.Font.Size = 10
+    ticker_style.Font.Bold = True
+    ticker_style.HorizontalAlignment = -4108
+    ticker_style.VerticalAlignment = -4108
 
     # --------------------------------------------------
     # BASE FORMATTING – Apply black theme to all cells
     # --------------------------------------------------
 
-    # Set black background for entire used range
-    # 0x000000 is hex for black color
-    used_range.api.Interior.Color = 0x000000
-    
-    # Set white text color for all cells
-    # 0xFFFFFF is hex for white color
-    used_range.api.Font.Color = 0xFFFFFF
-    
-    # Set font size to 10 points
-    used_range.api.Font.Size = 10
-    
-    # Center align text horizontally
-    # -4108 is Excel constant for xlCenter
-    used_range.api.HorizontalAlignment = -4108
-    
-    # Center align text vertically
-    used_range.api.VerticalAlignment = -4108
+    used_range.api.Style = "RawData Body"
 
-    # Add grid borders to all cells
-    # border_id 7-12 correspond to different border positions (top, bottom, left, right, etc.)
-    for border_id in range(7, 13):
-        # LineStyle = 1 means continuous line
-        used_range.api.Borders(border_id).LineStyle = 1
-        
-        # Weight = 1 means thin border
-        used_range.api.Borders(border_id).Weight = 1
-        
-        # Set border color to dark gray (0x404040) for subtle contrast on black
-        used_range.api.Borders(border_id).Color = 0x404040
+    # --------------------------------------------------
+    # HEADER ROW STYLING
+    # --------------------------------------------------
 
-    # Auto-fit column widths to content
-    used_range.columns.autofit()
+    # Get header range (all cells in first row); its width is known, so no expand() traversal
+    header = sheet.range((1, 1), (1, last_col))
+    header.api.Style = "RawData Header"
 
     # --------------------------------------------------
-    # HEADER ROW STYLING
+    # TICKER COLUMN SPECIAL STYLING
     # --------------------------------------------------
 
-    # Get header range (all cells in first row)
-    header = sheet.range("A1").expand("right")
-    
-    # Make header text bold
-    header.api.Font.Bold = True
-    
-    # Set header font size slightly larger than data
-    header.api.Font.Size = 11
-    
-    # Set header text color to white
-    header.api.Font.Color = 0xFFFFFF
-    
-    # Set header background color to dark blue (0x2E75B5)
-    header.api.Interior.Color = 0x2E75B5
+    # Get column letter for "Ticker" column
+    ticker_col = col_letter("Ticker")
+    if ticker_col:
+        # Ticker column, rows 2 to last_row
+        sheet.api.Range(column_areas([ticker_col], 2, last_row)).Style = "RawData Ticker"
+
+    # Add grid borders to all cells
+    # Setting the whole Borders collection covers every edge and inside line of the
+    # range at once: 3 COM calls instead of 3 for each of the 6 border positions
+    try:
+        borders = used_range.api.Borders
+        borders.LineStyle = 1                                                       # LineStyle = 1 means continuous line
+        borders.Weight = 1                                                          # Weight = 1 means thin border
+        borders.Color = 0x404040                                                    # Dark gray (0x404040) for subtle contrast on black
+    except Exception:
+        # Fallback: set each border position separately
+        # border_id 7-12 correspond to different border positions (top, bottom, left, right, etc.)
+        for border_id in range(7, 13):
+            used_range.api.Borders(border_id).LineStyle = 1
+            used_range.api.Borders(border_id).Weight = 1
+            used_range.api.Borders(border_id).Color = 0x404040
+
+    # Auto-fit column widths to content (after the styles, so the 11pt header is measured)
+    used_range.columns.autofit()
 
     # Freeze panes for better navigation
     # Freeze header row (row 1) and first 2 columns
@@ -170,194 +253,118 @@ def format_excel(sheet):
         # If freezing fails, continue without it (non-critical)
         pass
 
-    # --------------------------------------------------
-    # TICKER COLUMN SPECIAL STYLING
-    # --------------------------------------------------
-
-    # Get column letter for "Ticker" column
-    ticker_col = col_letter("Ticker")
-    if ticker_col:
-        # Get the actual range object for Ticker column (rows 2 to last_row)
-        ticker_range = sheet.range(
-            (2, headers.index("Ticker") + 1),  # Start at row 2, Ticker column
-            (last_row, headers.index("Ticker") + 1)  # End at last row, Ticker column
-        )
-        # Make ticker symbols bold
-        ticker_range.api.Font.Bold = True
-        # Set ticker text color to bright blue (0x4FC3F7) for visibility on black
-        ticker_range.api.Font.Color = 0x4FC3F7
-
-    # --------------------------------------------------
-    # PRICE MOVEMENT INDICATORS FORMATTING
-    # --------------------------------------------------
-
-    # Dictionary defining which columns to format and how
-    # Format: "Column Name": (good_operator, good_formula, bad_operator, bad_formula)
-    price_indicators = {
-        "Dividend Yield": (5, ">0", 1, "<0"),  # Operator 5 = greater than, 1 = less than
-        "Upside %": (5, ">0", 1, "<0"),        # Same logic for upside percentage
-    }
-    
-    # Loop through each price indicator column
-    for col, (good_op, good_formula, bad_op, bad_formula) in price_indicators.items():
-        # Get the data range for this column
-        rng = col_range(col)
-        if rng:  # Only proceed if column exists
-            try:
-                # Clear any existing conditional formatting from this column
-                rng.api.FormatConditions.Delete()
-
-                # Add conditional formatting for POSITIVE values
-                # Type=2 means format based on cell value
-                # Operator=good_op (5 = greater than)
-                # Formula1=">0" means apply formatting when value > 0
-                cond = rng.api.FormatConditions.Add(
-                    Type=2, Operator=good_op, Formula1=good_formula
-                )
-                # Set font color to bright green for positive values
-                cond.Font.Color = 0x4CAF50
-                # Make positive values bold
-                cond.Font.Bold = True
-
-                # Add conditional formatting for NEGATIVE values
-                # Operator=bad_op (1 = less than)
-                # Formula1="<0" means apply formatting when value < 0
-                cond = rng.api.FormatConditions.Add(
-                    Type=2, Operator=bad_op, Formula1=bad_formula
-                )
-                # Set font color to bright red for negative values
-                cond.Font.Color = 0xF44336
-                # Make negative values bold
-                cond.Font.Bold = True
-            except Exception as e:
-                # If formatting fails, print error but continue with other columns
-                print(f"⚠️ Error formatting {col}: {e}")
+    # Helper function: Apply conditional formatting rules to several columns at once
+    # All columns go into ONE multi-area range, so Excel gets one Delete and one Add per rule
+    # no matter how many columns share the rules (Excel evaluates each rule per cell)
+    # Each rule is (test, font_color, bold)
+    def apply_rules(col_names, rules, label):
+        letters = [col_letter(name) for name in col_names]
+        letters = [letter for letter in letters if letter]                      # Skip columns that are missing
+        if not letters:
+            return
+        try:
+            rng = sheet.api.Range(column_areas(letters, 2, last_row))
+            app_api = sheet.api.Application
+
+            # Clear any existing conditional formatting from these columns
+            rng.FormatConditions.Delete()
+
+            for test, font_color, bold in rules:
+                # Excel reads relative references in a rule added over COM relative to the
+                # active cell, so write the rule for "this cell" (RC) and convert it to A1
+                # relative to the active cell; it then refers to each formatted cell itself
+                formula = app_api.ConvertFormula(cf_formula("RC", test), -4150, 1, 4, app_api.ActiveCell)
+
+                # Type=2 means xlExpression (format when the formula is TRUE)
+                cond = rng.FormatConditions.Add(Type=2, Formula1=formula)
+                cond.Font.Color = font_color
+                if bold:
+                    cond.Font.Bold = True
+        except Exception as e:
+            # If formatting fails, print error but continue with other columns
+            print(f"⚠️ Error formatting {label}: {e}")
 
     # --------------------------------------------------
-    # TECHNICAL INDICATORS FORMATTING - RSI
+    # PRICE MOVEMENT + TECHNICAL INDICATORS FORMATTING
     # --------------------------------------------------
 
-    # Get range for RSI (14) column
-    rsi_rng = col_range("RSI (14)")
-    if rsi_rng:  # Only proceed if RSI column exists
-        try:
-            # Clear existing conditional formatting
-            rsi_rng.api.FormatConditions.Delete()
-
-            # Add formatting for OVERSOLD condition (RSI < 30)
-            # Operator=1 means less than
-            # Formula1="30" means apply when value < 30
-            cond1 = rsi_rng.api.FormatConditions.Add(Type=2, Operator=1, Formula1="30")
-            # Set font color to bright blue for oversold
-            cond1.Font.Color = 0x2196F3
-
-            # Add formatting for OVERBOUGHT condition (RSI > 70)
-            # Operator=5 means greater than
-            # Formula1="70" means apply when value > 70
-            cond2 = rsi_rng.api.FormatConditions.Add(Type=2, Operator=5, Formula1="70")
-            # Set font color to orange for overbought
-            cond2.Font.Color = 0xFF9800
-            
-            # Note: RSI between 30-70 remains white (default color)
-            
-        except Exception as e:
-            # If formatting fails, print error but continue
-            print(f"⚠️ Error formatting RSI: {e}")
+    # Rules are defined once in CONDITIONAL_FORMATS (also used by write_rawdata_file)
+    for col_names, rules, label in CONDITIONAL_FORMATS:
+        apply_rules(col_names, rules, label)
 
     # Note: The actual code would continue with SMA, MACD, Analyst Sentiment,
     # Target Prices, Growth Metrics, ESG Scores, Confidence Level, 
     # Categorical columns, Date columns, and Text columns formatting
-    # Each follows the same pattern:
-    # 1. Get column range with col_range()
-    # 2. Clear existing formatting with .FormatConditions.Delete()
-    # 3. Add new conditional formatting rules
-    # 4. Set font colors for different conditions
+    # Each follows the same pattern: add a CONDITIONAL_FORMATS entry grouping the columns
+    # that share rules, each rule a (test, color, bold) tuple such as (">0", 0x4CAF50, True);
+    # cf_formula turns a test into =IFERROR(VALUE(cell)>0,FALSE) so text and N/A never match
     
     print("✅ Black background Excel formatting applied")
 
 
 #---------------------------------------------------------------- Step 4 Presentation logic for ESG stacking ------------------------------------------------------------------------
-def collapse_duplicate_ticker_rows(sheet):
+# Columns to KEEP on repeated ticker rows when collapsing duplicates
+# These are ESG-specific columns that should remain visible; every other column,
+# Ticker included, is blanked by blank_repeated_ticker_rows
+ESG_ONLY_COLUMNS = frozenset({
+    "ESG Theme", "Manual ESG Score", "Confidence Level",
+    "Assessment Criteria", "Review Date", "Analyst Notes",
+    "Upside Bucket", "ESG Category", "RSI Status",
+})
+
+
+def blank_repeated_ticker_rows(df):
     """
-    When a ticker appears multiple times (for different ESG themes):
-    - Keep only ESG-related columns on repeated rows
-    - Blank all other non-ESG columns for visual clarity
-    - This creates a stacked/grouped appearance in the spreadsheet
+    When a ticker appears multiple times (for different ESG themes), run BEFORE writing:
+    on rows that repeat the previous row's ticker, every non-ESG column
+    (including Ticker) is set to None, so the bulk write leaves those cells empty.
+    This creates a stacked/grouped appearance in the spreadsheet.
     """
-    
-    # Get all column headers from first row
-    headers = [cell.value for cell in sheet.range("A1").expand("right")]
-    
-    # Find last row with data
-    last_row = sheet.range("A1").expand("down").last_cell.row
-
-    # Find column index (1-based) of "Ticker" column
-    ticker_col_idx = headers.index("Ticker") + 1
-
-    # Define which columns to KEEP when collapsing duplicate rows
-    # These are ESG-specific columns that should remain visible
-    ESG_ONLY_COLUMNS = {
-        "ESG Theme", "Manual ESG Score", "Confidence Level",
-        "Assessment Criteria", "Review Date", "Analyst Notes",
-        "Upside Bucket", "ESG Category", "RSI Status",
-    }
+    # Columns to KEEP on repeated rows: ESG_ONLY_COLUMNS
+    # A row repeats when its ticker equals the row directly above it. This is not
+    # duplicated(): a ticker listed twice in Sheet1 gives two separate groups,
+    # and each group keeps its own first row, exactly as on the sheet
+    ticker = df["Ticker"]
+    repeated = ticker.eq(ticker.shift())
+
+    if repeated.any():
+        blank_cols = [c for c in df.columns if c not in ESG_ONLY_COLUMNS]   # Ticker included
+        df = df.astype({c: object for c in blank_cols})                     # Lets every column hold None
+        df.loc[repeated, blank_cols] = None
 
-    # Variable to track previous row's ticker
-    prev_ticker = None
-
-    # Loop through all data rows (starting at row 2, skipping header)
-    for row in range(2, last_row + 1):
-        # Get ticker value from current row
-        current_ticker = sheet.cells(row, ticker_col_idx).value
-
-        # Check if this ticker is same as previous row's ticker
-        if current_ticker == prev_ticker:
-            # This is a duplicate ticker row (same stock, different ESG theme)
-            
-            # Loop through all columns in this row
-            for col_idx, col_name in enumerate(headers, start=1):
-                # If column is NOT ESG-related AND NOT the Ticker column
-                if col_name not in ESG_ONLY_COLUMNS and col_name != "Ticker":
-                    # Clear the cell value (set to empty string)
-                    sheet.cells(row, col_idx).value = ""
-
-            # Also clear the ticker cell in duplicate rows
-            # This creates visual grouping where only first row shows ticker
-            sheet.cells(row, ticker_col_idx).value = ""
-        else:
-            # This is a new ticker, update prev_ticker for next iteration
-            prev_ticker = current_ticker
+    return df
 
 
 #---------------------------------------------------------------- Step 5 Calculated columns - DataFrame operations ------------------------------------------------------------------------
+def bucketize(values, edges, labels, na="N/A"):
+    """
+    Maps a column of numbers to labels in one vectorized pass.
+    labels[0] is for values below edges[0], labels[i] for edges[i-1] <= value < edges[i],
+    and the last label for values from edges[-1] up. Missing / non-numeric values get `na`.
+    """
+    # "N/A", None and anything else that isn't a number becomes NaN
+    arr = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+    # side="right" puts a value equal to an edge into the bucket above it
+    idx = np.searchsorted(edges, arr, side="right")
+    out = np.asarray(labels, dtype=object)[np.minimum(idx, len(labels) - 1)]
+    out[np.isnan(arr)] = na
+
+    return pd.Series(out, index=values.index)
+
+
 def add_upside_bucket(df):
     """
     Categorizes 'Upside %' values into human-readable buckets.
     Converts percentage strings like '6.16%' into categories like 'Medium (0–10%)'
     """
-    # Define classification function
-    def classify(val):
-        try:
-            # Handle missing or N/A values
-            if val == "N/A" or pd.isna(val):
-                return "N/A"
-            
-            # Remove % sign and convert to decimal (6.16% → 0.0616)
-            num = float(val.replace("%", "")) / 100
-            
-            # Categorize based on value
-            if num >= 0.10:
-                return "High (>10%)"
-            elif num >= 0:
-                return "Medium (0–10%)"
-            else:
-                return "Negative"
-        except Exception:
-            # If conversion fails, return N/A
-            return "N/A"
+    # Remove % sign and convert to decimal (6.16% → 0.0616)
+    upside = pd.to_numeric(
+        df["Upside %"].astype(str).str.replace("%", "", regex=False), errors="coerce"
+    ) / 100
 
-    # Apply classification function to each value in "Upside %" column
-    df["Upside Bucket"] = df["Upside %"].apply(classify)
+    # <0 → Negative, 0 to <10% → Medium, ≥10% → High
+    df["Upside Bucket"] = bucketize(upside, [0, 0.10], ["Negative", "Medium (0–10%)", "High (>10%)"])
     
     # Return modified DataFrame
     return df
@@ -367,28 +374,10 @@ def add_esg_category(df):
     Categorizes 'Manual ESG Score' into Good/Average/Poor buckets.
     Converts numeric scores like 75 into categories like 'Good (≥60)'
     """
-    def classify(val):
-        try:
-            # Handle missing or N/A values
-            if val == "N/A" or pd.isna(val):
-                return "N/A"
-            
-            # Convert to float
-            score = float(val)
-            
-            # Categorize based on score
-            if score >= 60:
-                return "Good (≥60)"
-            elif score >= 40:
-                return "Average (40–59)"
-            else:
-                return "Poor (<40)"
-        except Exception:
-            # If conversion fails, return N/A
-            return "N/A"
-
-    # Apply classification function
-    df["ESG Category"] = df["Manual ESG Score"].apply(classify)
+    # <40 → Poor, 40 to <60 → Average, ≥60 → Good
+    df["ESG Category"] = bucketize(
+        df["Manual ESG Score"], [40, 60], ["Poor (<40)", "Average (40–59)", "Good (≥60)"]
+    )
     
     # Return modified DataFrame
     return df
@@ -398,33 +387,224 @@ def add_rsi_status(df):
     Categorizes 'RSI (14)' values into Overbought/Oversold/Neutral.
     Converts numeric RSI like 31.11 into categories like 'Neutral'
     """
-    def classify(val):
-        try:
-            # Handle missing or N/A values
-            if val == "N/A" or pd.isna(val):
-                return "N/A"
-            
-            # Convert to float
-            rsi = float(val)
-            
-            # Categorize based on RSI value
-            if rsi > 70:
-                return "Overbought (>70)"
-            elif rsi < 30:
-                return "Oversold (<30)"
-            else:
-                return "Neutral"
-        except Exception:
-            # If conversion fails, return N/A
-            return "N/A"
-
-    # Apply classification function
-    df["RSI Status"] = df["RSI (14)"].apply(classify)
+    # <30 → Oversold, 30 to 70 → Neutral, >70 → Overbought
+    # The upper edge sits just above 70 so that exactly 70 stays Neutral
+    df["RSI Status"] = bucketize(
+        df["RSI (14)"], [30, np.nextafter(70, np.inf)], ["Oversold (<30)", "Neutral", "Overbought (>70)"]
+    )
     
     # Return modified DataFrame
     return df
 
 
+def sheet_values(df):
+    """
+    Converts the DataFrame into one 2D list (header row + data rows) of plain Python values
+    that Excel accepts in a single Range.Value2 assignment. Missing values become empty cells.
+    """
+    values = df.astype(object).where(df.notna(), None)                            # NaN / NaT / pd.NA → None (empty cell)
+    return [list(df.columns)] + values.values.tolist()
+
+
+#---------------------------------------------------------------- Step 5.1 Direct file write (Excel not running) ------------------------------------------------------------------------
+def _rgb(com_color):
+    """
+    Excel COM colors are 0xBBGGRR integers, openpyxl wants "RRGGBB" strings.
+    Converting the same constants keeps both write paths looking identical.
+    """
+    return f"{com_color & 0xFF:02X}{(com_color >> 8) & 0xFF:02X}{(com_color >> 16) & 0xFF:02X}"
+
+
+def _rawdata_styles(wb):
+    """
+    Registers the RawData named styles on the workbook (once) and returns their names.
+    Every cell then refers to one of these few styles instead of carrying its own
+    formatting, so styles.xml stays the same size however many rows are written.
+    """
+    white, black = _rgb(0xFFFFFF), _rgb(0x000000)
+    thin = Side(style="thin", color=_rgb(0x404040))                              # Dark gray grid lines
+    grid = Border(left=thin, right=thin, top=thin, bottom=thin)
+    center = Alignment(horizontal="center", vertical="center")
+    black_fill = PatternFill("solid", fgColor=black)
+
+    styles = {
+        "header": NamedStyle("RawData Header", font=Font(size=11, bold=True, color=white),
+                             fill=PatternFill("solid", fgColor=_rgb(0x2E75B5)), border=grid, alignment=center),
+        "body": NamedStyle("RawData Body", font=Font(size=10, color=white),
+                           fill=black_fill, border=grid, alignment=center),
+        "ticker": NamedStyle("RawData Ticker", font=Font(size=10, bold=True, color=_rgb(0x4FC3F7)),
+                             fill=black_fill, border=grid, alignment=center),
+        "date": NamedStyle("RawData Date", font=Font(size=10, color=white), fill=black_fill,
+                           border=grid, alignment=center, number_format="yyyy-mm-dd"),
+    }
+
+    # Re-runs find the styles already saved in the workbook. The xlwings path (workbook_style)
+    # creates the same names without borders, so an existing style is brought back to this
+    # definition rather than reused as-is
+    for style in styles.values():
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+            continue
+        existing = wb._named_styles[style.name]
+        for attr in ("font", "fill", "border", "alignment", "number_format"):
+            setattr(existing, attr, getattr(style, attr))
+        existing.bind(wb)                                                        # Re-registers its font/fill/border ids
+
+    return {key: style.name for key, style in styles.items()}
+
+
+def write_rawdata_file(excel_path, final_df):
+    """
+    Writes final_df to the RawData sheet directly in the .xlsm file with openpyxl,
+    for when no Excel instance is running (no COM calls at all).
+    Produces the same layout as the xlwings path: data, colors, borders,
+    conditional formatting and frozen panes. The VBA project is kept (keep_vba=True).
+    """
+    print("✍️ Excel is not running - writing RawData straight to the file...")
+
+    wb = load_workbook(excel_path, keep_vba=True)
+    ws = wb["RawData"]
+
+    # Clear the previous run: all rows plus their conditional formatting
+    ws.delete_rows(1, ws.max_row)
+    ws.conditional_formatting = ConditionalFormattingList()
+
+    # Header + data rows, one append per row
+    data = sheet_values(final_df)
+    for row in data:
+        ws.append(row)
+    last_row, last_col = len(data), len(final_df.columns)
+
+    # Pick one named style per column (by reference, not per-cell formatting)
+    names = _rawdata_styles(wb)
+    column_styles = [
+        names["ticker"] if col == "Ticker"
+        else names["date"] if pd.api.types.is_datetime64_any_dtype(final_df[col])
+        else names["body"]
+        for col in final_df.columns
+    ]
+    for cell in ws[1]:
+        cell.style = names["header"]
+    for row in ws.iter_rows(min_row=2, max_row=last_row, max_col=last_col):
+        for cell, style in zip(row, column_styles):
+            cell.style = style
+
+    # Same conditional formatting rules as format_excel; in the file format a rule's relative
+    # references are relative to the top-left cell of its range, so each column gets its own rule
+    letters = {col: get_column_letter(i) for i, col in enumerate(final_df.columns, start=1)}
+    for col_names, rules, _label in CONDITIONAL_FORMATS:
+        present = [letters[c] for c in col_names if c in letters]
+        if not present or last_row < 2:
+            continue
+        for test, font_color, bold in rules:
+            for c in present:
+                rule = FormulaRule(formula=[cf_formula(f"{c}2", test)[1:]],              # openpyxl wants it without "="
+                                   font=Font(color=_rgb(font_color), bold=bold))
+                ws.conditional_formatting.add(f"{c}2:{c}{last_row}", rule)
+
+    # Freeze header row and first 2 columns
+    ws.freeze_panes = "C2"
+
+    # openpyxl can't autofit, so size each column to its longest value
+    for i, col in enumerate(final_df.columns):
+        longest = max((len(str(row[i])) for row in data if row[i] is not None), default=0)
+        ws.column_dimensions[get_column_letter(i + 1)].width = min(longest + 2, 60)
+
+    wb.save(excel_path)
+
+
+#---------------------------------------------------------------- Step 5.2 Excel connection cache ------------------------------------------------------------------------
+# The workbook handle found by attach_workbook, kept for later runs in the same Python process
+# (e.g. a long-running backend calling update_excel repeatedly). The lock keeps two threads
+# from looking it up / opening the workbook at the same time.
+_EXCEL_CACHE = {}
+_EXCEL_CACHE_LOCK = threading.Lock()
+
+
+def attach_workbook(excel_path):
+    """
+    Returns (app, workbook) for Stock_data.xlsm in the running Excel instance,
+    opening the workbook there if needed, or (None, None) when Excel isn't running.
+    """
+    with _EXCEL_CACHE_LOCK:
+        workbook = _EXCEL_CACHE.get("wb")
+        if workbook is not None:
+            try:
+                workbook.name                                                   # Fails once the workbook or Excel was closed
+                return workbook.app, workbook
+            except Exception:
+                _EXCEL_CACHE.clear()
+
+        # Get active Excel application instance
+        app = xw.apps.active
+        if app is None:
+            # No Excel instance is running
+            return None, None
+
+        # Look for already open workbook with "Stock_data.xlsm" in name
+        # next() returns first matching workbook or None if not found
+        workbook = next(
+            (wb for wb in app.books if "Stock_data.xlsm" in wb.name),
+            None
+        )
+
+        # If workbook not already open, open it
+        if workbook is None:
+            workbook = app.books.open(excel_path)
+
+        _EXCEL_CACHE["wb"] = workbook
+        return app, workbook
+
+
+#---------------------------------------------------------------- Step 5.3 Manual_ESG cache ------------------------------------------------------------------------
+# Parsed Manual_ESG frames keyed by (path, modification time). Only a long-running process
+# calling update_excel repeatedly gets hits; a fresh run (run_update.bat / Button 1) always misses
+_MANUAL_ESG_CACHE = {}
+
+
+def cached_manual_esg(path, mtime, source):
+    """
+    Manual_ESG for (path, mtime). On a miss it is read from `source`, the workbook the
+    caller already opened (see open_workbook), so the file is still parsed only once.
+    """
+    key = (path, mtime)
+    if key not in _MANUAL_ESG_CACHE:
+        _MANUAL_ESG_CACHE.clear()                                               # Older versions of the file are never needed again
+        _MANUAL_ESG_CACHE[key] = read_manual_esg(source)
+    return _MANUAL_ESG_CACHE[key]
+
+
+#---------------------------------------------------------------- Step 5.4 Optional CSV sidecar load ------------------------------------------------------------------------
+def load_rawdata_from_csv(sheet, final_df, csv_path):
+    """
+    Alternative to the Value2 write (USE_CSV_SIDECAR): saves final_df as a CSV with
+    pandas' C writer, then has Excel import it natively through a text QueryTable
+    on RawData!A1. The QueryTable is created on the first run and reused afterwards.
+    """
+    final_df.to_csv(csv_path, index=False, date_format="%Y-%m-%d")
+
+    connection = f"TEXT;{csv_path}"
+    tables = sheet.api.QueryTables
+    query = next(
+        (tables(i) for i in range(1, tables.Count + 1) if tables(i).Connection == connection),
+        None
+    )
+
+    # One-time setup of the QueryTable pointing at the CSV
+    if query is None:
+        query = tables.Add(Connection=connection, Destination=sheet.api.Range("A1"))
+        query.TextFileParseType = 1                                                 # xlDelimited
+        query.TextFileCommaDelimiter = True
+        query.TextFilePlatform = 65001                                              # UTF-8 (pandas' default encoding)
+        query.TextFileStartRow = 1                                                  # Row 1 holds the headers
+        query.RefreshStyle = 0                                                      # xlOverwriteCells: don't insert/shift cells
+        query.AdjustColumnWidth = False                                             # format_excel autofits afterwards
+        query.RefreshOnFileOpen = False
+
+    # Synchronous refresh, so formatting only starts once the data is on the sheet
+    query.Refresh(BackgroundQuery=False)
+
+
 #-------------------------------------------------------------------- Step 6 MAIN EXECUTION FUNCTION ------------------------------------------------------------------------
 def update_excel():
     """
@@ -455,49 +635,49 @@ def update_excel():
             return False  # Return failure
 
         # --------------------------------------------------
-        # STEP 2: Connect to Excel application
+        # STEP 2-3: Connect to Excel and open or attach to workbook
         # --------------------------------------------------
         
-        # Get active Excel application instance
-        app = xw.apps.active
-        if app is None:
-            # No Excel instance is running
-            print("❌ Please open Excel first")
-            return False
+        # Get active Excel application instance and the open workbook (reused from earlier runs)
+        # Both are None when no Excel instance is running; RawData is then written to the file directly (Step 6)
+        app, workbook = attach_workbook(excel_path)
 
-        # --------------------------------------------------
-        # STEP 3: Open or attach to workbook
-        # --------------------------------------------------
-        
-        # Look for already open workbook with "Stock_data.xlsm" in name
-        # next() returns first matching workbook or None if not found
-        workbook = next(
-            (wb for wb in app.books if "Stock_data.xlsm" in wb.name),
-            None
-        )
-
-        # If workbook not already open, open it
-        if workbook is None:
-            workbook = app.books.open(excel_path)
-
-        # Get the "RawData" sheet
-        sheet = workbook.sheets["RawData"]
+        if app is not None:
+            # Get the "RawData" sheet
+            sheet = workbook.sheets["RawData"]
 
         # --------------------------------------------------
         # STEP 4: Fetch input data
         # --------------------------------------------------
         
+        # Parse the workbook file once and read both input sheets from it
+        input_book = open_workbook(excel_path)
+        source = input_book if input_book is not None else excel_path
+
         print("📥 Fetching tickers...")
         # Read ticker symbols from Sheet1 of the Excel file
-        tickers = get_tickers_from_excel(excel_path, sheet_name="Sheet1")
+        tickers = get_tickers_from_excel(source, sheet_name="Sheet1")
 
-        print("📊 Fetching automated data...")
-        # Fetch stock data with technical indicators for all tickers
-        df = fetch_stock_data_with_indicators(tickers)
+        # Nothing to fetch, merge, write or format
+        if not tickers:
+            if input_book is not None:
+                input_book.close()
+            print("⚠️ No tickers found in Sheet1 - nothing to update")
+            return True
 
         print("📝 Reading Manual_ESG...")
-        # Read ESG data from Manual_ESG sheet
-        manual_esg_df = read_manual_esg(excel_path)
+        # Read ESG data from Manual_ESG sheet; repeated calls in the same process reuse it until
+        # the file is saved again (copy so the cached frame is never modified)
+        manual_esg_df = cached_manual_esg(excel_path, os.path.getmtime(excel_path), source).copy()
+
+        # Release the file handle before the (long) fetch
+        if input_book is not None:
+            input_book.close()
+
+        print("📊 Fetching automated data...")
+        # Fetch stock data with technical indicators for all tickers
+        # Tickers are fetched concurrently (up to FETCH_WORKERS at a time) since the time is network wait
+        df = fetch_stock_data_with_indicators(tickers, max_workers=FETCH_WORKERS)
 
         # --------------------------------------------------
         # STEP 5: Merge and enrich data
@@ -516,29 +696,65 @@ def update_excel():
         final_df = add_esg_category(final_df)
         final_df = add_rsi_status(final_df)
 
-        # --------------------------------------------------
-        # STEP 6: Write to Excel
-        # --------------------------------------------------
+        # Presentation logic: blank repeated ticker rows in the DataFrame, so the single bulk
+        # write already shows the stacked ESG layout (no cell-by-cell pass on the sheet afterwards)
+        final_df = blank_repeated_ticker_rows(final_df)
+
+        # No Excel running: write the file with openpyxl instead of going through COM
+        if app is None:
+            write_rawdata_file(excel_path, final_df)
+            print("✅ Excel update complete")
+            return True
+
+        # All writes to the sheet run with repaint, recalculation, alerts and events off;
+        # the previous settings come back when the block ends, even on an error
+        with _excel_batch_mode(app):
+            # --------------------------------------------------
+            # STEP 6: Write to Excel
+            # --------------------------------------------------
         
-        print("✍️ Writing to Excel...")
+            print("✍️ Writing to Excel...")
         
-        # Clear existing content in RawData sheet
-        sheet.clear()
+            # Clear existing content in RawData sheet
+            sheet.clear()
         
-        # Write DataFrame to sheet starting at cell A1
-        # xlwings automatically writes headers and all data
-        sheet.range("A1").value = final_df
-
-        # --------------------------------------------------
-        # STEP 7: Apply formatting
-        # --------------------------------------------------
+            nrows = len(final_df) + 1                                                   # Header row + data rows
+            if USE_CSV_SIDECAR:
+                # pandas writes the table to a CSV next to the workbook and Excel loads it
+                # with its own text import (QueryTable) instead of through COM
+                load_rawdata_from_csv(sheet, final_df, os.path.join(base_dir, CSV_SIDECAR_NAME))
+            else:
+                # Write headers and all data starting at cell A1 in ONE Value2 assignment
+                # (no index column, and no per-cell conversion by the xlwings converter)
+                data = sheet_values(final_df)
+                sheet.range((1, 1), (nrows, len(final_df.columns))).api.Value2 = data
+
+            # Value2 only carries the date serial, so give date columns a date format
+            date_cols = [
+                get_column_letter(i) for i, col in enumerate(final_df.columns, start=1)
+                if pd.api.types.is_datetime64_any_dtype(final_df[col])
+            ]
+            if date_cols and nrows > 1:
+                sheet.api.Range(column_areas(date_cols, 2, nrows)).NumberFormat = "yyyy-mm-dd"
+
+            # --------------------------------------------------
+            # STEP 7: Apply formatting
+            # --------------------------------------------------
         
-        # Apply visual formatting (colors, borders, alignment)
-        format_excel(sheet)
+            # The sheet now holds exactly final_df, so its size and headers are known
+            # without asking Excel (header row + one row per DataFrame row)
+            headers = list(final_df.columns)
+            last_row = len(final_df) + 1
+            last_col = len(headers)
+
+            # Apply visual formatting (colors, borders, alignment)
+            format_excel(sheet, headers, last_row, last_col)
+
+            # Duplicate ticker rows were already blanked in final_df (blank_repeated_ticker_rows)
+
+            # One full recalculation now that all writes are done
+            app.calculate()
 
-        # Apply presentation logic (collapse duplicate ticker rows)
-        collapse_duplicate_ticker_rows(sheet)
-        
         # --------------------------------------------------
         # STEP 8: Completion
         # --------------------------------------------------
@@ -548,11 +764,14 @@ def update_excel():
 
     except Exception as e:
         # If ANY error occurs in the try block
-        #print(f"❌ Error: {e}")
+        print(f"❌ Error: {e}")
+
+        # The cached Excel handles may be what failed, so look them up again next time
+        with _EXCEL_CACHE_LOCK:
+            _EXCEL_CACHE.clear()
         
         # Print detailed traceback for debugging
-        # import traceback
-        # traceback.print_exc()
+        traceback.print_exc()
         
         return False  # Return failure
 